@@ -2,15 +2,16 @@ from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
-import pandas as pd
 
 import sys
 import os
+import re
+import shutil
 
 sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__),'..')), 'scripts'))
-from reddit_extraction import extract_reddit_comments, save_comments
-from sentiment_analysis import process_tweets as process_sentiment
-from load_to_postgres import load_processed_to_postgres
+# Stdlib only. The pipeline modules (pandas, praw, nltk, SQLAlchemy) are
+# imported inside the tasks so the scheduler does not load them on every parse
+from task_metrics import instrumented
 
 default_args = {
     'owner': 'airflow',
@@ -31,38 +32,153 @@ dag = DAG(
     tags=['twitter', 'sentiment', 'nlp'],
 )
 
-# Define search terms
-search_terms = ["climate change", "renewable energy", "sustainability"]
-
-# Task to extract Reddit comments
-def extract_and_save_reddit_comments(**kwargs):
-    comments_df = extract_reddit_comments(subreddit_name='news', limit=100)
-    output_path = "data/raw"
-    os.makedirs(output_path, exist_ok=True)
-    filename = save_comments(comments_df, output_path)
-    kwargs['ti'].xcom_push(key='comments_file', value=filename)
-    return filename
-
-# Task to analyze sentiment
-def analyze_comment_sentiment(**kwargs):
-    ti = kwargs['ti']
-    input_file = ti.xcom_pull(task_ids='extract_comments', key='comments_file')
-    processed_df = process_sentiment(input_file)
-    output_file = input_file.replace("raw", "processed")
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    processed_df.to_csv(output_file, index=False)
+# Extraction tasks running at once; each gets an equal share of the Reddit request budget
+EXTRACT_PARALLELISM = int(os.getenv('EXTRACT_PARALLELISM', '4'))
+# Retries of a failed extract_source task (e.g. a Reddit outage)
+EXTRACT_RETRIES = int(os.getenv('EXTRACT_RETRIES', '3'))
+
+def run_directory(kwargs):
+    """Per-run directory name, so mapped tasks of concurrent runs never share files"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', kwargs['run_id'])
+
+def collected(values):
+    """Return values of all mapped instances of a task as a list, without empty ones"""
+    return [value for value in values if value]
+
+# Fan-out: one extraction task per subreddit
+def list_reddit_sources(**kwargs):
+    # Comma-separated list of subreddits
+    subreddits = [s.strip() for s in os.getenv('REDDIT_SUBREDDITS', 'news').split(',') if s.strip()]
+    return [{'subreddit': subreddit} for subreddit in subreddits]
+
+# Task to extract Reddit comments from one subreddit
+@instrumented
+def extract_and_save_reddit_comments(subreddit, **kwargs):
+    from extraction_scheduler import REDDIT_REQUESTS_PER_MINUTE, extract_sources, make_reddit_client
+    from extraction_state import MARK_COLUMNS, ExtractionState
+    from file_io import RAW_COMMENT_SCHEMA
+    from raw_sink import RawSink
+    
+    # High-water marks so each run only fetches comments it hasn't seen
+    state = ExtractionState(os.getenv('EXTRACTION_STATE_PATH', 'data/state/extraction_state.sqlite'))
+    try:
+        reddit = make_reddit_client(REDDIT_REQUESTS_PER_MINUTE / EXTRACT_PARALLELISM)
+        # Parquet by default; set PIPELINE_FILE_FORMAT=csv to hand off gzipped CSV files instead
+        file_format = os.getenv('PIPELINE_FILE_FORMAT', 'parquet')
+        # Comments are written out as they arrive, into compressed files under
+        # data/raw/reddit/date=YYYY-MM-DD/, and listed in this run's manifest.
+        # A failed fetch raises, which deletes the files and fails the task
+        # so Airflow retries it. reddit_limit only caps a subreddit's first
+        # fetch; later ones page back to its mark, however many comments that takes
+        with RawSink('reddit', RAW_COMMENT_SCHEMA, run_directory(kwargs), name=subreddit,
+                     file_format=file_format, key_columns=MARK_COLUMNS['reddit']) as sink:
+            written = extract_sources(subreddits=[subreddit], reddit_limit=100, reddit=reddit,
+                                      state=state, sinks={'reddit': sink})['reddit']
+            manifest = sink.close()
+        # Only advance the marks once the comments are on disk
+        state.advance_reddit(written)
+    finally:
+        state.close()
+    return manifest
+
+# Split the files listed in the extraction manifests into fixed-size shards for scoring
+@instrumented
+def plan_sentiment_shards(manifests, **kwargs):
+    from file_io import RAW_COMMENT_SCHEMA, write_shards
+    from raw_sink import manifest_files
+    
+    # Only this run's new files, however many earlier runs left in data/raw
+    raw_files = [path for manifest in collected(manifests) for path in manifest_files(manifest)]
+    shard_size = int(os.getenv('SENTIMENT_SHARD_SIZE', '50000'))
+    file_format = os.getenv('PIPELINE_FILE_FORMAT', 'parquet')
+    shard_dir = os.path.join("data/shards", run_directory(kwargs))
+    shards = write_shards(raw_files, shard_dir, shard_size, RAW_COMMENT_SCHEMA, file_format=file_format)
+    print(f"Split {len(raw_files)} extracted file(s) into {len(shards)} shard(s) of up to {shard_size} rows")
+    return [{'shard_file': shard} for shard in shards]
+
+# Task to analyze sentiment of one shard
+@instrumented
+def analyze_shard_sentiment(shard_file, **kwargs):
+    from sentiment_analysis import process_tweets_streaming as process_sentiment_streaming
+    
+    # Shards already run in parallel, so each one uses a single process by default
+    workers = int(os.getenv('SENTIMENT_WORKERS', '1'))
+    chunk_size = int(os.getenv('SENTIMENT_CHUNK_SIZE', '50000'))
+    cache_path = os.getenv('SENTIMENT_CACHE_PATH', 'data/cache/sentiment_cache.sqlite')
+    # e.g. 0.8 to score near-duplicate comments once per cluster; unset to score every row
+    threshold = os.getenv('NEAR_DUPLICATE_THRESHOLD')
+    # reference, vectorized (NumPy VADER) or fast (NumPy VADER, no TextBlob)
+    backend = os.getenv('SENTIMENT_BACKEND', 'vectorized')
+    output_file = os.path.join("data/processed", run_directory(kwargs), os.path.basename(shard_file))
+    # Stream the shard so memory stays bounded by the chunk size
+    process_sentiment_streaming(shard_file, output_file, chunk_size=chunk_size,
+                                workers=workers, cache_path=cache_path,
+                                near_duplicate_threshold=float(threshold) if threshold else None,
+                                backend=backend)
     return output_file
 
+# Fan-in: load every processed shard in one transaction
+def load_sentiment_shards(processed_files, **kwargs):
+    from load_to_postgres import load_processed_to_postgres
+    
+    result = load_processed_to_postgres(processed_files=collected(processed_files), **kwargs)
+    # The rows are committed, so this run's shards and processed files are no
+    # longer needed; set KEEP_RUN_FILES=1 to keep them for debugging
+    if os.getenv('KEEP_RUN_FILES', '0') != '1':
+        for root in ("data/shards", "data/processed"):
+            shutil.rmtree(os.path.join(root, run_directory(kwargs)), ignore_errors=True)
+    return result
+
+# Create upcoming monthly partitions and retire the ones past retention
+@instrumented
+def maintain_table_partitions(**kwargs):
+    from database import maintain_partitions
+    
+    # 'detach' keeps expired partitions as standalone tables instead of dropping them
+    action = os.getenv('PARTITION_RETENTION_ACTION', 'drop')
+    return maintain_partitions(detach_only=action == 'detach')
+
 # Define tasks
-extract_task = PythonOperator(
-    task_id='extract_comments',
+sources_task = PythonOperator(
+    task_id='list_sources',
+    python_callable=list_reddit_sources,
+    dag=dag,
+)
+
+extract_task = PythonOperator.partial(
+    task_id='extract_source',
     python_callable=extract_and_save_reddit_comments,
+    # Bounds the concurrent API clients to the request budget split above
+    max_active_tis_per_dagrun=EXTRACT_PARALLELISM,
+    retries=EXTRACT_RETRIES,
+    retry_delay=timedelta(minutes=2),
+    dag=dag,
+).expand(op_kwargs=sources_task.output)
+
+shard_task = PythonOperator(
+    task_id='plan_shards',
+    python_callable=plan_sentiment_shards,
+    # Resolves to the manifests returned by every extract_source instance
+    op_kwargs={'manifests': extract_task.output},
+    dag=dag,
+)
+
+sentiment_task = PythonOperator.partial(
+    task_id='analyze_shard',
+    python_callable=analyze_shard_sentiment,
+    dag=dag,
+).expand(op_kwargs=shard_task.output)
+
+partition_task = PythonOperator(
+    task_id='maintain_partitions',
+    python_callable=maintain_table_partitions,
     dag=dag,
 )
 
-sentiment_task = PythonOperator(
-    task_id='analyze_sentiment',
-    python_callable=analyze_comment_sentiment,
+load_task = PythonOperator(
+    task_id='load_to_postgres',
+    python_callable=load_sentiment_shards,
+    op_kwargs={'processed_files': sentiment_task.output},
     dag=dag,
 )
 
@@ -73,5 +189,5 @@ dbt_run = BashOperator(
     dag=dag,
 )
 
-# Set task dependencies
-extract_task >> sentiment_task >> dbt_run
\ No newline at end of file
+# Set task dependencies (the mapped inputs above already imply the others)
+partition_task >> load_task >> dbt_run
@@ -0,0 +1,46 @@
+# benchmarks/extraction_concurrency.py
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from extraction_scheduler import extract_sources, make_reddit_client
+from reddit_extraction import extract_reddit_comments
+from fake_reddit_api import FakeRedditServer
+
+def run(n_subreddits, limit, latency, max_workers):
+    """Compare one-at-a-time and concurrent extraction against a local fake Reddit API"""
+    for name in ('REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT',
+                 'REDDIT_USERNAME', 'REDDIT_PASSWORD'):
+        os.environ.setdefault(name, 'benchmark')
+    server = FakeRedditServer(latency=latency, comments_per_subreddit=limit).start()
+    try:
+        # Generous budget so the comparison measures scheduling, not throttling
+        reddit = make_reddit_client(requests_per_minute=60000, **server.praw_config())
+        subreddits = [f"sub{i}" for i in range(n_subreddits)]
+
+        start = time.perf_counter()
+        rows = sum(len(extract_reddit_comments(subreddit, limit, reddit=reddit)) for subreddit in subreddits)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        frames = extract_sources(subreddits=subreddits, reddit_limit=limit,
+                                 max_workers=max_workers, reddit=reddit)
+        concurrent = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    slowest = -(-limit // 100) * latency
+    print(f"{n_subreddits} subreddits x {limit} comments, {latency:.2f}s per request")
+    print(f"sequential: {sequential:.2f}s ({rows} rows)")
+    print(f"concurrent: {concurrent:.2f}s ({len(frames['reddit'])} rows), slowest single source ~{slowest:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sequential vs. concurrent extraction wall time")
+    parser.add_argument('--subreddits', type=int, default=16)
+    parser.add_argument('--limit', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    run(args.subreddits, args.limit, args.latency, args.workers)
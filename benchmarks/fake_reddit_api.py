@@ -0,0 +1,131 @@
+# benchmarks/fake_reddit_api.py
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COMMENT_PATH = re.compile(r'^/r/([^/]+)/comments/?$')
+
+WORDS = ["great", "news", "terrible", "policy", "love", "hate", "this", "is", "not", "good", "bad", "today"]
+
+def make_comment(subreddit, index, newest_utc):
+    """Deterministic fake comment; index 0 is the newest"""
+    words = [WORDS[(index * 7 + k * 3) % len(WORDS)] for k in range(5 + index % 20)]
+    return {
+        'id': f"{subreddit}{index:07d}",
+        'name': f"t1_{subreddit}{index:07d}",
+        'body': " ".join(words),
+        'created_utc': float(newest_utc - index * 10),
+        'score': index % 50,
+    }
+
+class FakeRedditHandler(BaseHTTPRequestHandler):
+    """Serves just enough of the Reddit OAuth API for praw's comment listings"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path == '/api/v1/access_token':
+            self._send_json({'access_token': 'fake-token', 'token_type': 'bearer',
+                             'expires_in': 3600, 'scope': '*'})
+        else:
+            self._send_json({'error': 404}, status=404)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = COMMENT_PATH.match(url.path)
+        if not match:
+            self._send_json({'error': 404}, status=404)
+            return
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        time.sleep(server.latency)
+
+        subreddit = match.group(1)
+        query = parse_qs(url.query)
+        limit = min(int(query.get('limit', ['25'])[0]), 100)
+        after = query.get('after', [None])[0]
+        comments = server.comments_for(subreddit)
+        start = 0
+        if after:
+            names = [comment['name'] for comment in comments]
+            start = names.index(after) + 1 if after in names else len(comments)
+        page = comments[start:start + limit]
+        self._send_json({
+            'kind': 'Listing',
+            'data': {
+                'after': page[-1]['name'] if page and start + limit < len(comments) else None,
+                'before': None,
+                'children': [{'kind': 't1', 'data': comment} for comment in page],
+            },
+        })
+
+class FakeRedditServer(ThreadingHTTPServer):
+    """Local stand-in for the Reddit API with a fixed per-request latency
+
+    Comments for a subreddit are generated on first request; add_comments()
+    prepends newer ones to simulate new activity between runs.
+    """
+
+    daemon_threads = True
+    # Room for many concurrent clients connecting at once
+    request_queue_size = 128
+
+    def __init__(self, port=0, latency=0.0, comments_per_subreddit=1000, newest_utc=1750000000):
+        super().__init__(('127.0.0.1', port), FakeRedditHandler)
+        self.latency = latency
+        self.comments_per_subreddit = comments_per_subreddit
+        self.newest_utc = newest_utc
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._comments = {}
+
+    def comments_for(self, subreddit):
+        with self.lock:
+            if subreddit not in self._comments:
+                self._comments[subreddit] = [
+                    make_comment(subreddit, index, self.newest_utc)
+                    for index in range(self.comments_per_subreddit)
+                ]
+            return self._comments[subreddit]
+
+    def add_comments(self, subreddit, count):
+        """Prepend `count` newer comments to a subreddit's listing"""
+        existing = self.comments_for(subreddit)
+        with self.lock:
+            newest = existing[0]['created_utc'] if existing else self.newest_utc
+            offset = len(existing)
+            new = [
+                dict(make_comment(subreddit, offset + count - k, newest), created_utc=newest + (count - k) * 10)
+                for k in range(count)
+            ]
+            self._comments[subreddit] = new + existing
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def praw_config(self):
+        """Config overrides that point praw at this server"""
+        return {'oauth_url': self.url, 'reddit_url': self.url}
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
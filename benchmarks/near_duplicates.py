@@ -0,0 +1,62 @@
+# benchmarks/near_duplicates.py
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from sentiment_analysis import process_frame
+from near_duplicates import DEFAULT_THRESHOLD
+from synthetic_data import FILLER_WORDS
+
+SPAM_TEMPLATES = [
+    "Free crypto giveaway happening right now, click the link in my profile and claim your tokens before they run out",
+    "This is the best deal I have ever seen, check out my page for cheap followers and likes delivered in minutes",
+    "Copy and paste this comment if you agree that the moderators of this subreddit are doing a terrible job",
+    "I made five thousand dollars last week working from home, ask me how and I will send you the details",
+]
+SENTIMENT_WORDS = ["love", "hate", "great", "awful", "good", "bad", "happy", "angry", "best", "worst"]
+
+def make_flood(n_rows, flood_share, seed=42):
+    """Comments where flood_share of the rows are lightly edited copies of a few spam templates
+
+    The remaining rows are random word sequences, so they are distinct from
+    each other and from the spam.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(FILLER_WORDS + SENTIMENT_WORDS)
+    bodies = []
+    for _ in range(n_rows):
+        if rng.random() < flood_share:
+            words = SPAM_TEMPLATES[rng.integers(len(SPAM_TEMPLATES))].split()
+            # Bots vary a word or two so exact matching misses the copies
+            for _ in range(rng.integers(1, 3)):
+                words[rng.integers(len(words))] = str(rng.choice(vocabulary))
+        else:
+            words = rng.choice(vocabulary, rng.integers(5, 30)).tolist()
+        bodies.append(" ".join(words))
+    return pd.DataFrame({'id': [f"c{i}" for i in range(n_rows)], 'body': bodies})
+
+def run(n_rows, flood_shares, workers, threshold):
+    """Time process_frame with and without near-duplicate detection on flooded data"""
+    print(f"{'flood':>6} {'mode':>10} {'seconds':>9} {'rows scored':>12} {'rows/sec':>10}")
+    for share in flood_shares:
+        df = make_flood(n_rows, share)
+        for mode, setting in (('every row', None), ('clustered', threshold)):
+            start = time.perf_counter()
+            processed = process_frame(df.copy(), workers, near_duplicate_threshold=setting)
+            elapsed = time.perf_counter() - start
+            scored = processed['duplicate_cluster_id'].nunique() if setting is not None else n_rows
+            print(f"{share:>6.0%} {mode:>10} {elapsed:>9.2f} {scored:>12} {n_rows / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring work saved by near-duplicate detection")
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--flood-shares', type=float, nargs='+', default=[0.0, 0.3, 0.7])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+    run(args.rows, args.flood_shares, args.workers, args.threshold)
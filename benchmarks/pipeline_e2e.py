@@ -0,0 +1,252 @@
+# benchmarks/pipeline_e2e.py
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), 'scripts'))
+
+from task_metrics import peak_rss_mb
+
+STAGES = ['extract', 'sentiment', 'load']
+
+def extract_stage(api_url, subreddits, limit, output_dir):
+    """Fetch every subreddit from the fake API into a raw sink, like the extract task"""
+    from extraction_scheduler import extract_sources, make_reddit_client
+    from file_io import RAW_COMMENT_SCHEMA
+    from raw_sink import RawSink
+
+    reddit = make_reddit_client(requests_per_minute=600000, oauth_url=api_url, reddit_url=api_url)
+    with RawSink('reddit', RAW_COMMENT_SCHEMA, 'benchmark', root=output_dir) as sink:
+        written = extract_sources(subreddits=subreddits, reddit_limit=limit, max_workers=16, reddit=reddit,
+                                  sinks={'reddit': sink})['reddit']
+        manifest = sink.close()
+    return len(written), manifest
+
+def sentiment_stage(manifest, output_dir, workers, chunk_size, backend):
+    """Score the files of the extraction manifest without a cache, like the sentiment tasks on fresh data"""
+    from raw_sink import manifest_files
+    from sentiment_analysis import process_tweets_streaming
+
+    rows = 0
+    processed_files = []
+    for raw_file in manifest_files(manifest):
+        processed_file = os.path.join(output_dir, os.path.basename(raw_file))
+        rows += process_tweets_streaming(raw_file, processed_file, chunk_size=chunk_size, workers=workers,
+                                         backend=backend)
+        processed_files.append(processed_file)
+    return rows, processed_files
+
+def drop_load_tables(schema, table_name):
+    """Drop the throwaway table and its staging and rollup tables"""
+    from sqlalchemy import text
+    from database import get_engine
+    from sentiment_rollups import ROLLUP_GRAINS, rollup_table
+
+    with get_engine().begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table_name}, {schema}.{table_name}_staging"))
+        for grain in ROLLUP_GRAINS:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{rollup_table(table_name, grain)}"))
+
+def load_stage(processed_files, schema, table_name, load_mode):
+    """Load the processed files into a throwaway table with COPY, like the load task, then drop it
+
+    Returns the rows stored and the seconds the load itself took.
+    """
+    from sqlalchemy import text
+    from database import get_engine
+    from load_to_postgres import load_processed_files
+
+    # Incremental loads merge into an existing table; start every size from an empty one
+    drop_load_tables(schema, table_name)
+    start = time.perf_counter()
+    load_processed_files(processed_files, method='copy', mode=load_mode, schema=schema, table_name=table_name)
+    seconds = time.perf_counter() - start
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{table_name}")).scalar()
+    drop_load_tables(schema, table_name)
+    return rows, seconds
+
+def _stage_worker(func, args, queue):
+    try:
+        start = time.perf_counter()
+        rows, output = func(*args)
+        seconds = time.perf_counter() - start
+        queue.put({
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_sec': rows / seconds if seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_child_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+            'output': output,
+        })
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+def run_stage(func, *args):
+    """Run one stage in a fresh process so its peak RSS is its own
+
+    peak_rss_mb is the stage process itself; peak_child_rss_mb is the largest
+    of its own worker processes (e.g. the sentiment scoring pool).
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_stage_worker, args=(func, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, stages, workers, chunk_size, comments_per_subreddit, schema, table_name,
+        backend='vectorized', load_mode='incremental'):
+    """Run the selected stages at each dataset size and return the results document"""
+    from fake_reddit_api import FakeRedditServer
+
+    for name in ('REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT',
+                 'REDDIT_USERNAME', 'REDDIT_PASSWORD'):
+        os.environ.setdefault(name, 'benchmark')
+
+    results = []
+    server = FakeRedditServer(comments_per_subreddit=comments_per_subreddit).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for n_rows in sizes:
+                subreddits = [f"bench{n_rows}x{i}" for i in range(-(-n_rows // comments_per_subreddit))]
+                limit = min(n_rows, comments_per_subreddit)
+                # Build the listings up front so the fake API's own setup is not timed
+                for subreddit in subreddits:
+                    server.comments_for(subreddit)
+
+                size_dir = os.path.join(tmp_dir, str(n_rows))
+                manifest = processed_files = None
+                # Later stages consume earlier outputs, so every stage up to the last
+                # selected one runs; only the selected ones are reported
+                for stage in STAGES[:max(STAGES.index(stage) for stage in stages) + 1]:
+                    if stage == 'extract':
+                        result = run_stage(extract_stage, server.url, subreddits, limit, size_dir)
+                        manifest = result.pop('output', None)
+                    elif stage == 'sentiment':
+                        if manifest is None:
+                            result = {'error': "needs the extract stage's output"}
+                        else:
+                            result = run_stage(sentiment_stage, manifest, os.path.join(size_dir, 'processed'),
+                                               workers, chunk_size, backend)
+                            processed_files = result.pop('output', None)
+                    elif stage == 'load':
+                        if processed_files is None:
+                            result = {'error': "needs the sentiment stage's output"}
+                        else:
+                            result = run_stage(load_stage, processed_files, schema, table_name, load_mode)
+                            # Time the load alone, not the throwaway tables' setup and cleanup
+                            seconds = result.pop('output', None)
+                            if seconds:
+                                result.update(seconds=seconds, rows_per_sec=result['rows'] / seconds)
+
+                    if stage not in stages:
+                        continue
+                    result = dict(stage=stage, size=n_rows, **result)
+                    results.append(result)
+                    if 'error' in result:
+                        print(f"{n_rows:>10} {stage:>10} failed: {result['error']}")
+                    else:
+                        print(f"{n_rows:>10} {stage:>10} {result['seconds']:>10.2f} "
+                              f"{result['rows_per_sec']:>12.0f} {result['peak_rss_mb']:>10.1f}")
+    finally:
+        server.stop()
+
+    return {
+        'benchmark': 'pipeline_e2e',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {'workers': workers, 'chunk_size': chunk_size,
+                     'comments_per_subreddit': comments_per_subreddit,
+                     'backend': backend, 'load_mode': load_mode},
+        'results': results,
+    }
+
+def compare(base_path, new_path, threshold):
+    """Print per-stage throughput and memory changes; return True if any stage regressed"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    base_results = {(r['stage'], r['size']): r for r in base['results'] if 'error' not in r}
+    regressed = False
+    for setting in ('backend', 'load_mode'):
+        if base['settings'].get(setting) != new['settings'].get(setting):
+            print(f"Warning: the runs used different {setting}s ({base['settings'].get(setting)} vs "
+                  f"{new['settings'].get(setting)}), so their numbers are not comparable")
+
+    print(f"{'size':>10} {'stage':>10} {'base rows/s':>12} {'new rows/s':>12} {'change':>8} "
+          f"{'base MB':>9} {'new MB':>9}")
+    for result in new['results']:
+        key = (result['stage'], result['size'])
+        if 'error' in result or key not in base_results:
+            continue
+        before = base_results[key]
+        change = result['rows_per_sec'] / before['rows_per_sec'] - 1
+        memory_change = result['peak_rss_mb'] / before['peak_rss_mb'] - 1
+        flags = []
+        if change < -threshold:
+            flags.append('SLOWER')
+        if memory_change > threshold:
+            flags.append('MORE MEMORY')
+        regressed = regressed or bool(flags)
+        print(f"{result['size']:>10} {result['stage']:>10} {before['rows_per_sec']:>12.0f} "
+              f"{result['rows_per_sec']:>12.0f} {change:>+8.1%} {before['peak_rss_mb']:>9.1f} "
+              f"{result['peak_rss_mb']:>9.1f}  {' '.join(flags)}")
+    return regressed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end extract/sentiment/load benchmark")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the pipeline stages and write a results file")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    run_parser.add_argument('--chunk-size', type=int, default=50000)
+    # Defaults follow the DAG, so the benchmark measures what runs in production
+    run_parser.add_argument('--backend', choices=['reference', 'vectorized', 'fast'],
+                            default=os.getenv('SENTIMENT_BACKEND', 'vectorized'))
+    run_parser.add_argument('--load-mode', choices=['incremental', 'replace'],
+                            default=os.getenv('POSTGRES_LOAD_MODE', 'incremental'))
+    run_parser.add_argument('--comments-per-subreddit', type=int, default=5000)
+    run_parser.add_argument('--schema', default='raw_data')
+    run_parser.add_argument('--table', default='benchmark_e2e_processed_comments')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+
+    compare_parser = commands.add_parser('compare', help="compare two results files")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="relative slowdown or memory growth that counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        print(f"{'size':>10} {'stage':>10} {'seconds':>10} {'rows/sec':>12} {'peak MB':>10}")
+        document = run(args.sizes, args.stages, args.workers, args.chunk_size,
+                       args.comments_per_subreddit, args.schema, args.table, args.backend, args.load_mode)
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        sys.exit(1 if compare(args.base, args.new, args.threshold) else 0)
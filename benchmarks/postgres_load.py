@@ -0,0 +1,55 @@
+# benchmarks/postgres_load.py
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from load_to_postgres import load_processed_file
+
+def make_processed_file(n_rows, path, seed=42):
+    """Write a deterministic processed-comments CSV with n_rows rows"""
+    rng = np.random.default_rng(seed)
+    compound = rng.uniform(-1, 1, n_rows).round(4)
+    df = pd.DataFrame({
+        'id': [f"c{i:09d}" for i in range(n_rows)],
+        'created_utc': rng.integers(1_700_000_000, 1_750_000_000, n_rows).astype(float),
+        'body': ["This is a sample Reddit comment about the news!"] * n_rows,
+        'cleaned_text': ["this is a sample reddit comment about the news"] * n_rows,
+        'vader_compound': compound,
+        'vader_positive': rng.uniform(0, 1, n_rows).round(3),
+        'vader_negative': rng.uniform(0, 1, n_rows).round(3),
+        'vader_neutral': rng.uniform(0, 1, n_rows).round(3),
+        'textblob_polarity': rng.uniform(-1, 1, n_rows),
+        'textblob_subjectivity': rng.uniform(0, 1, n_rows),
+        'sentiment_category': np.where(compound >= 0.05, 'positive',
+                                       np.where(compound <= -0.05, 'negative', 'neutral')),
+    })
+    df.to_csv(path, index=False)
+
+def run(sizes, methods, schema, table_name):
+    """Load each dataset size with each method and print rows/sec"""
+    print(f"{'rows':>10} {'method':>8} {'seconds':>10} {'rows/sec':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            path = os.path.join(tmp_dir, f"processed_{n_rows}.csv")
+            make_processed_file(n_rows, path)
+            for method in methods:
+                start = time.perf_counter()
+                load_processed_file(path, method=method, mode='replace', schema=schema, table_name=table_name)
+                elapsed = time.perf_counter() - start
+                print(f"{n_rows:>10} {method:>8} {elapsed:>10.2f} {n_rows / elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="COPY vs. batched INSERT load throughput (uses the POSTGRES_* environment variables)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--methods', nargs='+', default=['to_sql', 'values', 'copy'])
+    parser.add_argument('--schema', default='raw_data')
+    parser.add_argument('--table', default='benchmark_processed_reddit_comments')
+    args = parser.parse_args()
+    run(args.sizes, args.methods, args.schema, args.table)
@@ -0,0 +1,60 @@
+# benchmarks/reddit_streaming.py
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from database import get_engine
+from reddit_streaming import PostgresCommentSink, fake_comment_source, stream_comments
+from sentiment_rollups import ROLLUP_GRAINS, rollup_table
+
+TABLE_NAME = 'benchmark_streamed_comments'
+
+def run(n_comments, batch_sizes, flush_seconds, backend, schema='raw_data'):
+    """Stream fake comments into a throwaway table at each batch size, then replay the stream
+
+    The replay delivers the same comments again, as a restarted stream
+    would; none of them may be loaded twice.
+    """
+    print(f"{'batch size':>10} {'pass':>7} {'seconds':>9} {'rows/sec':>10} {'batches':>8} "
+          f"{'duplicates':>11} {'loaded':>8} {'stored':>8}")
+    engine = get_engine()
+    try:
+        for batch_size in batch_sizes:
+            drop_tables(engine, schema)
+            sink = PostgresCommentSink(schema=schema, table_name=TABLE_NAME)
+            start_utc = int(time.time())
+            for name in ('stream', 'replay'):
+                start = time.perf_counter()
+                stats = stream_comments(fake_comment_source(n_comments, start_utc=start_utc), sink, batch_size=batch_size,
+                                        flush_seconds=flush_seconds, backend=backend)
+                elapsed = time.perf_counter() - start
+                with engine.connect() as conn:
+                    stored, distinct = conn.execute(
+                        text(f"SELECT COUNT(*), COUNT(DISTINCT id) FROM {schema}.{TABLE_NAME}")).one()
+                if stored != distinct:
+                    raise AssertionError(f"{stored - distinct} comments were loaded more than once")
+                print(f"{batch_size:>10} {name:>7} {elapsed:>9.2f} {n_comments / elapsed:>10.0f} {stats['batches']:>8} "
+                      f"{stats['duplicates']:>11} {stats['loaded']:>8} {stored:>8}")
+    finally:
+        drop_tables(engine, schema)
+
+def drop_tables(engine, schema):
+    """Drop the throwaway table and its staging and rollup tables"""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{TABLE_NAME}, {schema}.{TABLE_NAME}_staging"))
+        for grain in ROLLUP_GRAINS:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{rollup_table(TABLE_NAME, grain)}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batch streaming throughput and exactly-once loading "
+                                                 "(needs a reachable Postgres, configured via POSTGRES_*)")
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--flush-seconds', type=float, default=5.0)
+    parser.add_argument('--backend', default='vectorized')
+    args = parser.parse_args()
+    run(args.comments, args.batch_sizes, args.flush_seconds, args.backend)
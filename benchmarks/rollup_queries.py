@@ -0,0 +1,100 @@
+# benchmarks/rollup_queries.py
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from database import get_engine, write_table
+from sentiment_rollups import ROLLUP_GRAINS, ROLLUP_MEASURES, query_sentiment, rollup_table
+from synthetic_data import generate_reddit_chunk
+
+TABLE_NAME = 'benchmark_rollup_comments'
+CHUNK_ROWS = 100000
+
+def scored_chunk(n_rows, seed, chunk_index, end_utc, span_seconds):
+    """Synthetic comments with random scores, as the sentiment task would write them"""
+    df = generate_reddit_chunk(n_rows, seed=seed, chunk_index=chunk_index, start_row=chunk_index * CHUNK_ROWS,
+                               end_utc=end_utc, span_seconds=span_seconds).to_pandas()
+    rng = np.random.default_rng([seed, chunk_index])
+    df['cleaned_text'] = df['body']
+    for measure in ROLLUP_MEASURES:
+        df[measure] = rng.uniform(-1, 1, n_rows).astype(np.float32)
+    df['sentiment_category'] = rng.choice(['negative', 'neutral', 'positive'], n_rows)
+    return df
+
+def raw_query(conn, schema, start, end):
+    """The rollup query's answer computed from the rows: per subreddit and category, over the hours in [start, end)"""
+    averages = ", ".join(f"AVG({measure})" for measure in ROLLUP_MEASURES)
+    return conn.execute(text(f"""
+    SELECT subreddit, sentiment_category, COUNT(*), {averages}
+    FROM {schema}.{TABLE_NAME}
+    WHERE created_utc >= :start AND created_utc < :end
+    GROUP BY 1, 2 ORDER BY 1, 2
+    """), {'start': int(start.timestamp()), 'end': int(end.timestamp())}).fetchall()
+
+def run(n_rows, days, repeats, schema='raw_data'):
+    """Load n_rows comments over the last days days, then time one range query from the rows and from the rollups"""
+    engine = get_engine()
+    end_utc = int(time.time()) // 3600 * 3600
+    span_seconds = days * 86400
+    try:
+        drop_tables(engine, schema)
+        start = time.perf_counter()
+        for chunk_index, offset in enumerate(range(0, n_rows, CHUNK_ROWS)):
+            write_table(scored_chunk(min(CHUNK_ROWS, n_rows - offset), 42, chunk_index, end_utc, span_seconds),
+                        'processed_reddit_comments', schema, TABLE_NAME)
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {n_rows} rows with rollup updates in {elapsed:.2f}s ({n_rows / elapsed:.0f} rows/sec)")
+
+        # All but the first and last few hours, so both rollups answer part of it
+        range_start = pd.Timestamp(end_utc - span_seconds + 5 * 3600, unit='s')
+        range_end = pd.Timestamp(end_utc - 7 * 3600, unit='s')
+        with engine.connect() as conn:
+            for grain in ROLLUP_GRAINS:
+                rows = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{rollup_table(TABLE_NAME, grain)}")).scalar()
+                print(f"{rollup_table(TABLE_NAME, grain)}: {rows} rows")
+            timings = {}
+            for name, query in (('rows', lambda: raw_query(conn, schema, range_start, range_end)),
+                                ('rollups', lambda: query_sentiment(range_start, range_end,
+                                                                    by=('subreddit', 'sentiment_category'),
+                                                                    schema=schema, table_name=TABLE_NAME, conn=conn))):
+                times = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    result = query()
+                    times.append(time.perf_counter() - start)
+                timings[name] = (min(times), result)
+        print(f"{'source':>8} {'seconds':>9} {'speedup':>8}")
+        for name, (seconds, _) in timings.items():
+            print(f"{name:>8} {seconds:>9.4f} {timings['rows'][0] / seconds:>7.1f}x")
+
+        rows, rollups = timings['rows'][1], timings['rollups'][1]
+        counts = np.array([row[2] for row in rows])
+        averages = np.array([row[3:] for row in rows], dtype=np.float64)
+        if not np.array_equal(counts, rollups['row_count'].to_numpy()):
+            raise AssertionError("Row counts from the rollups differ from the rows")
+        difference = np.max(np.abs(averages - rollups[[f"avg_{m}" for m in ROLLUP_MEASURES]].to_numpy(np.float64)))
+        print(f"Max difference of the averages: {difference:.2g}")
+    finally:
+        drop_tables(engine, schema)
+
+def drop_tables(engine, schema):
+    """Drop the throwaway table and its rollups"""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{TABLE_NAME}"))
+        for grain in ROLLUP_GRAINS:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{rollup_table(TABLE_NAME, grain)}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-range sentiment queries from the rows vs. from the rollups "
+                                                 "(needs a reachable Postgres, configured via POSTGRES_*)")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.days, args.repeats)
@@ -0,0 +1,81 @@
+# benchmarks/sentiment_backends.py
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from sentiment_analysis import SENTIMENT_BACKENDS, clean_text_series, get_analyzers, score_batch
+from synthetic_data import generate_reddit_chunk
+from vectorized_vader import TOLERANCE
+
+# Tokens that exercise VADER's rules: capitalisation, boosters, negations,
+# "never so", "least", "but", idioms, emoticons and punctuation emphasis
+RULE_TOKENS = [
+    "but", "BUT", "least", "at", "very", "never", "so", "this", "not", "isn't", "kind", "of",
+    "sort", "extremely", "VERY", "barely", "cut", "me", "some", "slack", "the", "bomb", "yeah",
+    "right", "kiss", "death", "hand", "upper", ":)", ":(", "great.", "good!", "BAD", "awful?", "cat,"
+]
+
+def make_corpora(n_rows, seed=42):
+    """Cleaned synthetic comments, and raw texts mixing lexicon words with VADER's special cases"""
+    synthetic = clean_text_series(generate_reddit_chunk(n_rows, seed=seed).column('body').to_pandas()).tolist()
+
+    rng = random.Random(seed)
+    lexicon = sorted(get_analyzers()[0].lexicon)
+    raw = []
+    for _ in range(n_rows):
+        words = []
+        for _ in range(rng.randint(0, 30)):
+            word = rng.choice(RULE_TOKENS) if rng.random() < 0.4 else rng.choice(lexicon)
+            if rng.random() < 0.1:
+                word = word.upper()
+            if rng.random() < 0.1:
+                word += rng.choice(["!", "?", ",", ".", "!!!", "??"])
+            words.append(word)
+        raw.append(" ".join(words))
+    return {'synthetic': synthetic, 'raw': raw}
+
+def run(n_rows, backends):
+    """Time score_batch per backend on each corpus and check its VADER scores against the reference"""
+    exceeded = False
+    for name, texts in make_corpora(n_rows).items():
+        print(f"{name} corpus, {n_rows} texts")
+        print(f"{'backend':>11} {'seconds':>9} {'rows/sec':>10} {'speedup':>8} {'max VADER diff':>15}")
+        start = time.perf_counter()
+        reference = score_batch(texts)
+        baseline = time.perf_counter() - start
+        print(f"{'reference':>11} {baseline:>9.2f} {n_rows / baseline:>10.0f} {1:>7.2f}x {'':>15}")
+        for backend in backends:
+            if backend == 'reference':
+                continue
+            start = time.perf_counter()
+            scores = score_batch(texts, backend)
+            elapsed = time.perf_counter() - start
+            differences = {col: float(np.max(np.abs(scores[col].astype(np.float64) - reference[col])))
+                           for col in TOLERANCE}
+            worst = max(differences.values())
+            print(f"{backend:>11} {elapsed:>9.2f} {n_rows / elapsed:>10.0f} {baseline / elapsed:>7.2f}x {worst:>15.2g}")
+            for col, difference in differences.items():
+                # The scores are stored as float32, which blurs the last digit a little
+                if difference > TOLERANCE[col] + np.finfo(np.float32).eps:
+                    print(f"  {col} differs by {difference} (tolerance {TOLERANCE[col]})")
+                    exceeded = True
+            # Backends that score TextBlob must match it exactly
+            for col in ('textblob_polarity', 'textblob_subjectivity'):
+                if not np.isnan(scores[col]).all() and not np.array_equal(scores[col], reference[col]):
+                    print(f"  {col} differs on {(scores[col] != reference[col]).sum()} rows")
+                    exceeded = True
+            if not np.array_equal(scores['sentiment_category'].codes, reference['sentiment_category'].codes):
+                print(f"  sentiment_category differs on {(scores['sentiment_category'] != reference['sentiment_category']).sum()} rows")
+    return not exceeded
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment backend throughput and agreement with nltk's VADER and TextBlob")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--backends', nargs='+', choices=SENTIMENT_BACKENDS, default=list(SENTIMENT_BACKENDS))
+    args = parser.parse_args()
+    sys.exit(0 if run(args.rows, args.backends) else 1)
@@ -0,0 +1,107 @@
+# benchmarks/sentiment_memory.py
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+
+from task_metrics import peak_rss_mb
+
+SENTIMENT_COLUMNS = [
+    'vader_compound', 'vader_positive', 'vader_negative', 'vader_neutral',
+    'textblob_polarity', 'textblob_subjectivity', 'sentiment_category'
+]
+
+def _score_chunk_lists(texts):
+    """Score texts into lists of Python floats and strings, as process_frame used to"""
+    from sentiment_analysis import NEUTRAL_SENTIMENT, analyze_sentiment
+
+    columns = {col: [] for col in SENTIMENT_COLUMNS}
+    for text in texts:
+        try:
+            scores = analyze_sentiment(text)
+        except Exception:
+            scores = NEUTRAL_SENTIMENT
+        for col in SENTIMENT_COLUMNS:
+            columns[col].append(scores[col])
+    return columns
+
+def baseline_frame(df, workers):
+    """The previous process_frame: list columns, a float64/object DataFrame and a concat"""
+    import pandas as pd
+    from sentiment_analysis import clean_text_series, get_text_column, start_scoring_pool
+
+    text_column = get_text_column(df.columns)
+    df[text_column] = df[text_column].fillna("")
+    df['cleaned_text'] = clean_text_series(df[text_column])
+    texts = list(df['cleaned_text'])
+    if workers <= 1:
+        columns = _score_chunk_lists(texts)
+    else:
+        chunk_size = max(1, -(-len(texts) // (workers * 4)))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        columns = {col: [] for col in SENTIMENT_COLUMNS}
+        with start_scoring_pool(workers) as pool:
+            for chunk_columns in pool.map(_score_chunk_lists, chunks):
+                for col in SENTIMENT_COLUMNS:
+                    columns[col].extend(chunk_columns[col])
+    sentiment_df = pd.DataFrame(columns, index=df.index)
+    return pd.concat([df, sentiment_df], axis=1)
+
+def measure(input_file, workers, baseline, queue):
+    """Score input_file with process_frame (or the baseline path) and report the memory it took"""
+    from file_io import read_frame
+    from sentiment_analysis import get_analyzers, process_frame
+
+    get_analyzers()
+    df = read_frame(input_file)
+    n_rows = len(df)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    processed = baseline_frame(df, workers) if baseline else process_frame(df, workers)
+    seconds = time.perf_counter() - start
+    peak_growth = peak_rss_mb() - before
+    result_bytes = sum(processed[col].memory_usage(index=False, deep=True) for col in SENTIMENT_COLUMNS)
+    queue.put({
+        'rows': n_rows,
+        'seconds': seconds,
+        'peak_growth_bytes_per_row': peak_growth * 1024 * 1024 / n_rows,
+        'result_bytes_per_row': result_bytes / n_rows,
+    })
+
+def run(sizes, workers, baseline=False):
+    """Print peak memory growth and result size per row at each dataset size
+
+    With baseline, the previous float64/object path is measured too, next to
+    the current one.
+    """
+    from synthetic_data import write_synthetic
+
+    paths = ['baseline', 'current'] if baseline else ['current']
+    print(f"{'rows':>10} {'path':>9} {'seconds':>10} {'peak growth B/row':>18} {'result B/row':>13}")
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            path = os.path.join(tmp_dir, f"reddit_{n_rows}.parquet")
+            write_synthetic('reddit', n_rows, path, seed=42)
+            for name in paths:
+                # A fresh process per run so the peak RSS belongs to this run alone
+                queue = context.Queue()
+                process = context.Process(target=measure, args=(path, workers, name == 'baseline', queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                print(f"{result['rows']:>10} {name:>9} {result['seconds']:>10.2f} "
+                      f"{result['peak_growth_bytes_per_row']:>18.0f} {result['result_bytes_per_row']:>13.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory per processed row of process_frame")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50000, 200000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--baseline', action='store_true',
+                        help="also measure the previous float64/object result path")
+    args = parser.parse_args()
+    run(args.sizes, args.workers, args.baseline)
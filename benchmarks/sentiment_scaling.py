@@ -0,0 +1,40 @@
+# benchmarks/sentiment_scaling.py
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from sentiment_analysis import score_parallel
+
+WORDS = [
+    "i", "love", "hate", "this", "the", "news", "is", "great", "awful", "terrible",
+    "not", "bad", "good", "very", "happy", "sad", "angry", "policy", "government",
+    "people", "really", "never", "best", "worst", "wow", "lol", "climate", "energy"
+]
+
+def make_texts(n_rows, seed=42):
+    """Build a deterministic list of comment-like texts"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))) for _ in range(n_rows)]
+
+def run(n_rows, worker_counts):
+    """Time score_parallel at each worker count and print rows/sec"""
+    texts = make_texts(n_rows)
+    print(f"Scoring {n_rows} texts on a machine with {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'seconds':>10} {'rows/sec':>12} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        score_parallel(texts, workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {n_rows / elapsed:>12.0f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment scoring throughput vs. worker count")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    run(args.rows, args.workers)
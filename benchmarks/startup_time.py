@@ -0,0 +1,76 @@
+# benchmarks/startup_time.py
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import textwrap
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DAG_FILE = os.path.join('airflow', 'dags', 'twitter_sentiment_dag.py')
+
+# What each task has to do before it can start on its first row
+COLD_START = {
+    'extract_source': "import extraction_scheduler, reddit_extraction, extraction_state",
+    'plan_shards': "import file_io",
+    'analyze_shard': "import sentiment_analysis; sentiment_analysis.score_batch(['warm up'])",
+    'load_to_postgres': "import load_to_postgres",
+}
+
+def dag_imports(root):
+    """Module-level imports of the DAG file other than Airflow's, as source code"""
+    with open(os.path.join(root, DAG_FILE)) as f:
+        tree = ast.parse(f.read())
+    lines = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or '']
+        else:
+            continue
+        if not any(name.split('.')[0] == 'airflow' for name in names):
+            lines.append(ast.unparse(node))
+    return "\n".join(lines)
+
+def time_snippet(root, code, repeat):
+    """Median seconds to run code in a fresh interpreter with scripts/ importable"""
+    program = textwrap.dedent(f"""
+        import sys, time
+        sys.path.insert(0, {os.path.join(root, 'scripts')!r})
+        start = time.perf_counter()
+        exec({code!r})
+        print(time.perf_counter() - start)
+    """)
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', program], cwd=root, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings), None
+
+def run(root, repeat):
+    """Print DAG parse time and per-task cold-start time for the checkout at root"""
+    print(f"Measuring {root} (median of {repeat} fresh interpreters)")
+    checks = [
+        ('DAG parse (full file)', f"path = {os.path.join(root, DAG_FILE)!r}; "
+                                  f"exec(compile(open(path).read(), path, 'exec'), {{'__file__': path}})"),
+        ('DAG parse (non-Airflow imports)', dag_imports(root) or "pass"),
+    ]
+    checks += [(f"cold start: {task}", code) for task, code in COLD_START.items()]
+    for name, code in checks:
+        seconds, error = time_snippet(root, code, repeat)
+        if error:
+            print(f"{name:<40} skipped ({error})")
+        else:
+            print(f"{name:<40} {seconds:>8.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DAG parse time and task cold-start time")
+    parser.add_argument('--root', default=REPO_ROOT,
+                        help="repository checkout to measure, e.g. a git worktree of an older revision")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(os.path.abspath(args.root), args.repeat)
@@ -0,0 +1,45 @@
+# benchmarks/text_cleaning.py
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'scripts'))
+from sentiment_analysis import clean_text, clean_text_series
+
+TOKENS = [
+    "Great", "news", "today!", "@someone", "#Breaking", "https://t.co/abc123", "www.example.com",
+    "I", "can't", "believe", "it's", "2025...", "100%", "agree", "lol", "WOW", ":)", "the", "policy"
+]
+
+def make_texts(n_rows, seed=42):
+    """Build a deterministic Series of raw comment-like texts"""
+    rng = random.Random(seed)
+    return pd.Series([" ".join(rng.choice(TOKENS) for _ in range(rng.randint(5, 30))) for _ in range(n_rows)])
+
+def run(sizes):
+    """Time the per-row and vectorized cleaning paths at each size"""
+    print(f"{'rows':>10} {'apply (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for n_rows in sizes:
+        texts = make_texts(n_rows)
+
+        start = time.perf_counter()
+        old = texts.apply(clean_text)
+        old_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = clean_text_series(texts)
+        new_elapsed = time.perf_counter() - start
+
+        if not old.equals(new.astype(old.dtype)):
+            raise AssertionError(f"Vectorized cleaning differs from clean_text at {n_rows} rows")
+        print(f"{n_rows:>10} {old_elapsed:>10.2f} {new_elapsed:>11.2f} {old_elapsed / new_elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row clean_text vs. vectorized clean_text_series")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,37 @@
+-- Daily counts and sums per sentiment category, kept incrementally.
+-- Each run recomputes in full every day that has a comment loaded or changed
+-- since the last run, however old, so late and edited rows are picked up
+-- without double counting; delete+insert replaces all of a day's categories.
+-- The fast sentiment backend leaves the TextBlob scores NULL, so they are
+-- counted separately from the comments.
+{{ config(materialized='incremental', unique_key='comment_date', incremental_strategy='delete+insert', on_schema_change='append_new_columns') }}
+
+WITH comments AS (
+    SELECT
+        (to_timestamp(created_utc) AT TIME ZONE 'UTC')::date as comment_date,
+        sentiment_category,
+        vader_compound,
+        textblob_polarity,
+        textblob_subjectivity,
+        loaded_at
+    FROM {{ ref('stg_reddit_comments') }}
+)
+
+SELECT
+    comment_date,
+    sentiment_category,
+    COUNT(*) as comment_count,
+    SUM(vader_compound) as sum_vader_score,
+    COUNT(textblob_polarity) as textblob_count,
+    SUM(textblob_polarity) as sum_textblob_polarity,
+    SUM(textblob_subjectivity) as sum_textblob_subjectivity,
+    MAX(loaded_at) as loaded_at
+FROM comments
+{% if is_incremental() %}
+WHERE comment_date IN (
+    SELECT comment_date FROM comments
+    WHERE loaded_at > (SELECT COALESCE(MAX(loaded_at), '-infinity') FROM {{ this }})
+                      - interval '{{ var("loaded_at_lookback", "1 hour") }}'
+)
+{% endif %}
+GROUP BY 1, 2
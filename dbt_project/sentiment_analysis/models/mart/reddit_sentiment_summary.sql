@@ -1,11 +1,13 @@
 {{ config(materialized='table') }}
 
+-- Merges the daily counts and sums, so the means never rescan the comments
 SELECT
     sentiment_category,
-    COUNT(*) as comment_count,
-    AVG(vader_compound) as avg_vader_score,
-    AVG(textblob_polarity) as avg_textblob_polarity,
-    AVG(textblob_subjectivity) as avg_textblob_subjectivity
-FROM {{ ref('stg_reddit_comments') }}
+    SUM(comment_count)::bigint as comment_count,
+    SUM(sum_vader_score) / SUM(comment_count) as avg_vader_score,
+    -- Over the comments with TextBlob scores; days aggregated before textblob_count existed had them all
+    SUM(sum_textblob_polarity) / NULLIF(SUM(COALESCE(textblob_count, comment_count)), 0) as avg_textblob_polarity,
+    SUM(sum_textblob_subjectivity) / NULLIF(SUM(COALESCE(textblob_count, comment_count)), 0) as avg_textblob_subjectivity
+FROM {{ ref('int_reddit_sentiment_daily') }}
 GROUP BY sentiment_category
-ORDER BY sentiment_category
\ No newline at end of file
+ORDER BY sentiment_category
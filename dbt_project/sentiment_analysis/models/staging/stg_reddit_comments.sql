@@ -1,4 +1,4 @@
-{{ config(materialized='table') }}
+{{ config(materialized='incremental', unique_key='id', on_schema_change='append_new_columns') }}
 
 SELECT
     id,
@@ -11,5 +11,16 @@ SELECT
     vader_neutral,
     textblob_polarity,
     textblob_subjectivity,
-    sentiment_category
-FROM {{ source('raw_data', 'processed_reddit_comments') }} 
\ No newline at end of file
+    sentiment_category,
+    -- Id of the representative of this comment's near-duplicate cluster (NULL if detection was off)
+    duplicate_cluster_id,
+    -- When the load last inserted or changed the row
+    loaded_at
+FROM {{ source('raw_data', 'processed_reddit_comments') }}
+{% if is_incremental() %}
+-- Rows loaded or changed since the last run, whatever their created_utc; the
+-- lookback catches loads that committed after a later-started one. unique_key
+-- absorbs the overlap
+WHERE loaded_at > (SELECT COALESCE(MAX(loaded_at), '-infinity') FROM {{ this }})
+                  - interval '{{ var("loaded_at_lookback", "1 hour") }}'
+{% endif %}
@@ -1,5 +1,5 @@
 -- dbt_project/sentiment_analysis/models/staging/stg_tweets.sql
-{{ config(materialized='table') }}
+{{ config(materialized='incremental', unique_key='id', on_schema_change='append_new_columns') }}
 
 SELECT
     id,
@@ -12,5 +12,11 @@ SELECT
     vader_neutral,
     textblob_polarity,
     textblob_subjectivity,
-    sentiment_category
-FROM {{ source('raw_data', 'processed_reddit_comments') }}
\ No newline at end of file
+    sentiment_category,
+    loaded_at
+FROM {{ source('raw_data', 'processed_reddit_comments') }}
+{% if is_incremental() %}
+-- Rows loaded or changed since the last run (see stg_reddit_comments); unique_key absorbs the overlap
+WHERE loaded_at > (SELECT COALESCE(MAX(loaded_at), '-infinity') FROM {{ this }})
+                  - interval '{{ var("loaded_at_lookback", "1 hour") }}'
+{% endif %}
@@ -3,9 +3,13 @@ import json
 import tweepy
 import pandas as pd
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+from file_io import RAW_TWEET_SCHEMA
+from raw_sink import RawSink
+from synthetic_data import DEFAULT_END_UTC, DEFAULT_SPAN_SECONDS, generate_tweet_chunk
+
 load_dotenv()
 
 def authenticate_twitter():
@@ -18,39 +22,49 @@ def authenticate_twitter():
     client = tweepy.Client(bearer_token=bearer_token, wait_on_rate_limit=True)
     return client
 
-def extract_tweets(search_query, count=10):
+def fetch_tweets(client, search_query, count=10, since_id=None):
+    """Fetch recent tweets for a search query as a list of row dicts
+    
+    With since_id, only tweets newer than that id are returned.
+    """
+    response = client.search_recent_tweets(
+        query=search_query,
+        max_results=min(count, 100),
+        since_id=since_id,
+        tweet_fields=['created_at', 'public_metrics', 'entities']
+    )
+    
+    tweets = []
+    for tweet in response.data or []:
+        hashtags = []
+        if hasattr(tweet, 'entities') and tweet.entities and 'hashtags' in tweet.entities:
+            hashtags = [tag['tag'] for tag in tweet.entities['hashtags']]
+        
+        metrics = tweet.public_metrics if hasattr(tweet, 'public_metrics') else {}
+        
+        tweet_data = {
+            'id': str(tweet.id),
+            'created_at': tweet.created_at.strftime('%Y-%m-%d %H:%M:%S') if tweet.created_at else datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'text': tweet.text,
+            'user_name': 'user',
+            'user_location': '',
+            'retweet_count': metrics.get('retweet_count', 0),
+            'favorite_count': metrics.get('like_count', 0),
+            'hashtags': hashtags,
+            'search_query': search_query
+        }
+        tweets.append(tweet_data)
+    return tweets
+
+def extract_tweets(search_query, count=10, client=None, since_id=None):
     """Extract tweets based on search query using Twitter API v2 if available, otherwise fall back to mock data"""
     try:
-        client = authenticate_twitter()
-        
-        response = client.search_recent_tweets(
-            query=search_query,
-            max_results=min(count, 100),
-            tweet_fields=['created_at', 'public_metrics', 'entities']
-        )
+        if client is None:
+            client = authenticate_twitter()
         
-        if response.data:
-            tweets = []
-            for tweet in response.data:
-                hashtags = []
-                if hasattr(tweet, 'entities') and tweet.entities and 'hashtags' in tweet.entities:
-                    hashtags = [tag['tag'] for tag in tweet.entities['hashtags']]
-                
-                metrics = tweet.public_metrics if hasattr(tweet, 'public_metrics') else {}
-                
-                tweet_data = {
-                    'id': str(tweet.id),
-                    'created_at': tweet.created_at.strftime('%Y-%m-%d %H:%M:%S') if tweet.created_at else datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'text': tweet.text,
-                    'user_name': 'user',
-                    'user_location': '',
-                    'retweet_count': metrics.get('retweet_count', 0),
-                    'favorite_count': metrics.get('like_count', 0),
-                    'hashtags': hashtags,
-                    'search_query': search_query
-                }
-                tweets.append(tweet_data)
-            
+        tweets = fetch_tweets(client, search_query, count, since_id)
+        # With since_id, no results just means nothing new since the last run
+        if tweets or since_id is not None:
             return pd.DataFrame(tweets)
         else:
             print(f"No tweets found for query: {search_query}. Using mock data.")
@@ -60,79 +74,50 @@ def extract_tweets(search_query, count=10):
         print(f"Error accessing Twitter API: {str(e)}. Using mock data instead.")
         return generate_mock_tweets(search_query, count)
 
-def generate_mock_tweets(search_query, count=10):
-    """Generate mock tweet data for development and testing"""
-    mock_tweets = []
-    
-    positive_phrases = [
-        "I love how", "Great progress on", "Exciting developments in", 
-        "Impressive advances with", "Optimistic about"
-    ]
-    
-    negative_phrases = [
-        "Concerned about", "Disappointed with", "Worried that", 
-        "Frustrated by", "Skeptical of"
-    ]
+def generate_mock_tweets(search_query, count=10, seed=None):
+    """Generate mock tweet data for development and testing
     
-    hashtag_options = {
-        "climate change": ["ClimateAction", "GlobalWarming", "ClimateEmergency", "SaveEarth"],
-        "renewable energy": ["CleanEnergy", "SolarPower", "WindEnergy", "Sustainability"],
-        "sustainability": ["EcoFriendly", "GreenLiving", "ZeroWaste", "SustainableFuture"]
-    }
+    Uses the vectorized generator in synthetic_data; pass a seed for
+    reproducible output, otherwise tweets are spread over the last 72 hours.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+        end_utc, span_seconds = int(datetime.now().timestamp()), 72 * 3600
+    else:
+        end_utc, span_seconds = DEFAULT_END_UTC, DEFAULT_SPAN_SECONDS
     
-    default_hashtags = ["Future", "Innovation", "Technology", "Progress"]
-    
-    for i in range(count):
-        is_positive = random.random() > 0.5
-        sentiment_phrases = positive_phrases if is_positive else negative_phrases
-        
-        phrase = random.choice(sentiment_phrases)
-        tweet_text = f"{phrase} {search_query}. {'This could be a game changer!' if is_positive else 'We need better solutions.'}"
-        
-        relevant_hashtags = []
-        for key in hashtag_options:
-            if key.lower() in search_query.lower():
-                relevant_hashtags.extend(hashtag_options[key])
-        
-        if not relevant_hashtags:
-            relevant_hashtags = default_hashtags
-            
-        num_hashtags = random.randint(0, 3)
-        selected_hashtags = random.sample(relevant_hashtags, min(num_hashtags, len(relevant_hashtags)))
-        
-        created_time = datetime.now() - timedelta(hours=random.randint(1, 72))
-        mock_tweets.append({
-            'id': f"mock_{i}_{int(datetime.now().timestamp())}",
-            'created_at': created_time.strftime('%Y-%m-%d %H:%M:%S'),
-            'text': tweet_text,
-            'user_name': f"user_{random.randint(1000, 9999)}",
-            'user_location': random.choice(["New York", "London", "Tokyo", "Berlin", "Sydney", "", "Remote"]),
-            'retweet_count': random.randint(0, 500),
-            'favorite_count': random.randint(0, 1000),
-            'hashtags': selected_hashtags,
-            'search_query': search_query
-        })
+    table = generate_tweet_chunk(count, seed=seed, search_terms=[search_query],
+                                 end_utc=end_utc, span_seconds=span_seconds)
+    mock_tweets = table.to_pandas()
+    mock_tweets['hashtags'] = mock_tweets['hashtags'].map(list)
     
     print(f"Generated {count} mock tweets for: {search_query}")
-    return pd.DataFrame(mock_tweets)
+    return mock_tweets
 
-def save_tweets(df, output_path):
-    """Save tweets to CSV file"""
-    os.makedirs(output_path, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{output_path}/tweets_{timestamp}.csv"
-    df.to_csv(filename, index=False)
-    print(f"Saved {len(df)} tweets to {filename}")
-    return filename
+def save_tweets(df, output_path, file_format='parquet', run_id=None):
+    """Write tweets under output_path through a RawSink; returns the path of its manifest"""
+    run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    with RawSink('twitter', RAW_TWEET_SCHEMA, run_id, root=output_path, file_format=file_format) as sink:
+        sink.write(df)
+        return sink.close()
 
 if __name__ == "__main__":
-    search_terms = ["climate change", "renewable energy", "sustainability"]
+    from extraction_scheduler import extract_sources
+    from extraction_state import MARK_COLUMNS, ExtractionState
     
-    all_tweets = pd.DataFrame()
-    for term in search_terms:
-        print(f"Extracting tweets for: {term}")
-        tweets_df = extract_tweets(term, count=20)
-        all_tweets = pd.concat([all_tweets, tweets_df])
+    search_terms = ["climate change", "renewable energy", "sustainability"]
     
-    save_tweets(all_tweets, "data/raw")
\ No newline at end of file
+    # High-water marks so each run only fetches tweets newer than the last one seen
+    state = ExtractionState(os.getenv('EXTRACTION_STATE_PATH', 'data/state/extraction_state.sqlite'))
+    try:
+        # Fetch all search terms at once through one rate-limited client, writing
+        # the tweets out as each query completes
+        run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        with RawSink('twitter', RAW_TWEET_SCHEMA, run_id, key_columns=MARK_COLUMNS['twitter']) as sink:
+            written = extract_sources(search_terms=search_terms, tweet_count=20,
+                                      state=state, sinks={'twitter': sink})['twitter']
+            sink.close()
+        # Only advance the marks once the tweets are on disk
+        state.advance_twitter(written)
+    finally:
+        state.close()
@@ -0,0 +1,468 @@
+# scripts/database.py
+import csv
+import io
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+# Tables written by the pipeline: column names and types in table order,
+# the column they are range-partitioned on (by month), the indexes besides
+# the key, and the key rows are upserted on. Unique keys of partitioned
+# tables must include the partition column.
+TABLES = {
+    'raw_tweets': {
+        'columns': [
+            ('id', 'TEXT'),
+            ('created_at', 'TIMESTAMP'),
+            ('text', 'TEXT'),
+            ('user_name', 'TEXT'),
+            ('user_location', 'TEXT'),
+            ('retweet_count', 'INTEGER'),
+            ('favorite_count', 'INTEGER'),
+            ('hashtags', 'TEXT'),
+            ('search_query', 'TEXT'),
+            ('created_at_batch', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+        ],
+        'partition_by': 'created_at',
+        'indexes': [['created_at'], ['search_query', 'created_at']],
+        'primary_key': ['id', 'created_at'],
+    },
+    'processed_tweets': {
+        'columns': [
+            ('id', 'TEXT'),
+            ('created_at', 'TIMESTAMP'),
+            ('text', 'TEXT'),
+            ('cleaned_text', 'TEXT'),
+            ('user_name', 'TEXT'),
+            ('user_location', 'TEXT'),
+            ('retweet_count', 'INTEGER'),
+            ('favorite_count', 'INTEGER'),
+            ('search_query', 'TEXT'),
+            ('vader_compound', 'FLOAT'),
+            ('vader_positive', 'FLOAT'),
+            ('vader_negative', 'FLOAT'),
+            ('vader_neutral', 'FLOAT'),
+            ('textblob_polarity', 'FLOAT'),
+            ('textblob_subjectivity', 'FLOAT'),
+            ('sentiment_category', 'TEXT'),
+            ('processed_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+        ],
+        'partition_by': 'created_at',
+        'indexes': [['created_at'], ['sentiment_category', 'created_at']],
+        'primary_key': ['id', 'created_at'],
+    },
+    'processed_reddit_comments': {
+        'columns': [
+            ('id', 'VARCHAR(255)'),
+            ('created_utc', 'BIGINT'),
+            ('body', 'TEXT'),
+            ('cleaned_text', 'TEXT'),
+            ('vader_compound', 'FLOAT'),
+            ('vader_positive', 'FLOAT'),
+            ('vader_negative', 'FLOAT'),
+            ('vader_neutral', 'FLOAT'),
+            ('textblob_polarity', 'FLOAT'),
+            ('textblob_subjectivity', 'FLOAT'),
+            ('sentiment_category', 'VARCHAR(50)'),
+            ('duplicate_cluster_id', 'VARCHAR(255)'),
+            ('subreddit', 'VARCHAR(255)'),
+            # When the row was last inserted or changed; the dbt models' incremental cursor
+            ('loaded_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+        ],
+        'partition_by': 'created_utc',
+        'indexes': [['created_utc'], ['sentiment_category', 'created_utc']],
+        # No primary key: full reloads may repeat an id. Incremental loads
+        # add a unique index on the key instead (see load_to_postgres)
+        'key': ['id', 'created_utc'],
+    },
+}
+
+# Monthly partitions are kept for PARTITION_RETENTION_MONTHS months before the
+# current one, and created PARTITION_PREMAKE_MONTHS months ahead of it
+PARTITION_RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '12'))
+PARTITION_PREMAKE_MONTHS = int(os.getenv('PARTITION_PREMAKE_MONTHS', '3'))
+
+# Rows per multi-row INSERT statement of insert_values
+VALUES_PAGE_SIZE = 1000
+
+_engines = {}
+
+def database_config():
+    """Connection settings from the POSTGRES_* environment variables
+
+    The DB_* names that setup_database.py used to read are still honoured
+    as fallbacks, so older .env files keep working. DB_NAME now names the
+    project database itself rather than the database setup_database.py
+    first connected to.
+    """
+    def setting(name, legacy_name, default):
+        return os.getenv(f"POSTGRES_{name}", os.getenv(f"DB_{legacy_name}", default))
+
+    return {
+        'host': setting('HOST', 'HOST', 'postgres'),
+        'port': int(setting('PORT', 'PORT', '5432')),
+        'database': setting('DB', 'NAME', 'airflow'),
+        'username': setting('USER', 'USER', 'airflow'),
+        'password': setting('PASSWORD', 'PASSWORD', 'airflow'),
+        'pool_size': int(os.getenv('POSTGRES_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('POSTGRES_MAX_OVERFLOW', '5')),
+    }
+
+def get_engine(database=None):
+    """Pooled SQLAlchemy engine for the configured database (or another one on the same server)
+
+    Engines are created once per process and database and then reused, so
+    connections are kept open between loads instead of being re-established
+    on every call.
+    """
+    config = database_config()
+    database = database or config['database']
+    if database not in _engines:
+        url = URL.create('postgresql+psycopg2', username=config['username'], password=config['password'],
+                         host=config['host'], port=config['port'], database=database)
+        _engines[database] = create_engine(
+            url,
+            pool_size=config['pool_size'],
+            max_overflow=config['max_overflow'],
+            # Drop connections the server closed while they sat in the pool
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+    return _engines[database]
+
+def dispose_engines():
+    """Close all pooled connections, e.g. in a child process after a fork"""
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
+
+def table_columns(table):
+    """Column names of one of the pipeline TABLES, in table order"""
+    return [name for name, _ in TABLES[table]['columns']]
+
+def table_key(table):
+    """Columns identifying a row of one of the pipeline TABLES"""
+    spec = TABLES[table]
+    return spec.get('primary_key') or spec['key']
+
+def _relkind(conn, schema, table_name):
+    """'r' for a plain table, 'p' for a partitioned one, None if it does not exist"""
+    return conn.execute(text("""
+    SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = :schema AND c.relname = :table_name
+    """), {'schema': schema, 'table_name': table_name}).scalar()
+
+def create_table(conn, table, schema, table_name=None, replace=False, unlogged=False):
+    """Create one of the pipeline TABLES (under table_name if given) unless it exists
+
+    Tables are range-partitioned by month on their time column, with the
+    partitions around the current month, a default partition (for rows
+    without a time or past retention) and their indexes. A plain table left
+    by an earlier version is converted in place. Unlogged tables (staging)
+    are plain tables without keys or indexes. With replace=True an existing
+    table is dropped first.
+    """
+    spec = TABLES[table]
+    table_name = table_name or table
+    partitioned = not unlogged
+    definitions = [f"{name} {column_type}" for name, column_type in spec['columns']]
+    if partitioned and 'primary_key' in spec:
+        definitions.append(f"PRIMARY KEY ({', '.join(spec['primary_key'])})")
+    columns = ",\n    ".join(definitions)
+    
+    if replace:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table_name}"))
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    if not partitioned:
+        conn.execute(text(f"CREATE UNLOGGED TABLE IF NOT EXISTS {schema}.{table_name} (\n    {columns}\n)"))
+        return
+    
+    existing = _relkind(conn, schema, table_name)
+    if existing == 'p':
+        return
+    legacy = f"{table_name}_unpartitioned"
+    if existing is not None:
+        conn.execute(text(f"ALTER TABLE {schema}.{table_name} RENAME TO {legacy}"))
+    conn.execute(text(
+        f"CREATE TABLE {schema}.{table_name} (\n    {columns}\n) PARTITION BY RANGE ({spec['partition_by']})"))
+    for index_columns in spec['indexes']:
+        # Indexes on the parent are created on every partition, present and future
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {table_name}_{'_'.join(index_columns)}_idx "
+                          f"ON {schema}.{table_name} ({', '.join(index_columns)})"))
+    
+    if existing is None:
+        create_partitions(conn, table, schema, table_name)
+        return
+    # Move the rows of the plain table over, then drop it
+    legacy_columns = set(conn.execute(text("""
+    SELECT column_name FROM information_schema.columns WHERE table_schema = :schema AND table_name = :table_name
+    """), {'schema': schema, 'table_name': legacy}).scalars())
+    column_list = ", ".join(col for col in table_columns(table) if col in legacy_columns)
+    time_column = spec['partition_by']
+    first, last = conn.execute(text(f"SELECT MIN({time_column}), MAX({time_column}) FROM {schema}.{legacy}")).one()
+    create_partitions(conn, table, schema, table_name, start=first, end=last)
+    conn.execute(text(f"INSERT INTO {schema}.{table_name} ({column_list}) SELECT {column_list} FROM {schema}.{legacy}"))
+    conn.execute(text(f"DROP TABLE {schema}.{legacy}"))
+    print(f"Converted {schema}.{table_name} to a partitioned table")
+
+def _is_epoch(table):
+    """Whether the partition column holds Unix seconds rather than timestamps"""
+    spec = TABLES[table]
+    return dict(spec['columns'])[spec['partition_by']].startswith('BIGINT')
+
+def _month_of(value, epoch):
+    """(year, month) of a partition column value, or None for a missing one"""
+    if value is None or pd.isna(value):
+        return None
+    timestamp = pd.Timestamp(int(value), unit='s') if epoch else pd.Timestamp(value)
+    return timestamp.year, timestamp.month
+
+def _add_months(month, count):
+    index = month[0] * 12 + month[1] - 1 + count
+    return index // 12, index % 12 + 1
+
+def _month_bound(month, epoch):
+    """SQL literal of the first instant of a (year, month)"""
+    start = datetime(month[0], month[1], 1, tzinfo=timezone.utc)
+    return str(int(start.timestamp())) if epoch else f"'{start:%Y-%m-%d}'"
+
+def _current_month(now=None):
+    now = now or datetime.now(timezone.utc)
+    return now.year, now.month
+
+def value_range(series):
+    """Smallest and largest non-missing value of a partition column, as (start, end)"""
+    series = series.dropna()
+    if len(series) == 0:
+        return None, None
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_datetime(series)
+    return series.min(), series.max()
+
+def create_partitions(conn, table, schema, table_name=None, start=None, end=None, now=None):
+    """Create the monthly partitions a partitioned table needs, and its default partition
+
+    Covers every month from start's (but not before the retention window)
+    through PARTITION_PREMAKE_MONTHS months past end's or the current one,
+    whichever is later. start and end are values of the partition column;
+    loaders pass the range of the rows they are about to write. Existing
+    partitions are left alone. Returns the names of the partitions created.
+    """
+    table_name = table_name or table
+    epoch = _is_epoch(table)
+    current = _current_month(now)
+    oldest = _add_months(current, -PARTITION_RETENTION_MONTHS)
+    first = max(_month_of(start, epoch) or current, oldest)
+    last = _add_months(max(_month_of(end, epoch) or current, current), PARTITION_PREMAKE_MONTHS)
+    
+    existing = set(list_partitions(conn, schema, table_name))
+    created = []
+    month = first
+    while month <= last:
+        name = f"{table_name}_p{month[0]:04d}{month[1]:02d}"
+        if name not in existing:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {schema}.{name} PARTITION OF {schema}.{table_name} "
+                f"FOR VALUES FROM ({_month_bound(month, epoch)}) TO ({_month_bound(_add_months(month, 1), epoch)})"))
+            created.append(name)
+        month = _add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {schema}.{table_name}_default "
+                      f"PARTITION OF {schema}.{table_name} DEFAULT"))
+    return created
+
+def list_partitions(conn, schema, table_name):
+    """Monthly partitions of a table, as {name: (year, month)}"""
+    names = conn.execute(text("""
+    SELECT child.relname
+    FROM pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_class child ON child.oid = i.inhrelid
+    JOIN pg_namespace n ON n.oid = parent.relnamespace
+    WHERE n.nspname = :schema AND parent.relname = :table_name
+    """), {'schema': schema, 'table_name': table_name}).scalars()
+    partitions = {}
+    for name in names:
+        suffix = name[len(table_name) + 2:]
+        if name.startswith(f"{table_name}_p") and len(suffix) == 6 and suffix.isdigit():
+            partitions[name] = (int(suffix[:4]), int(suffix[4:]))
+    return partitions
+
+def drop_expired_partitions(conn, table, schema, table_name=None, retention_months=None,
+                            detach_only=False, now=None):
+    """Detach, and unless detach_only also drop, the monthly partitions past retention
+
+    Partitions of months more than retention_months (default
+    PARTITION_RETENTION_MONTHS) before the current one expire; expired rows
+    that landed in the default partition are deleted. Detached partitions
+    remain as plain tables of the same name. Returns the expired partitions.
+    """
+    table_name = table_name or table
+    retention_months = PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    oldest = _add_months(_current_month(now), -retention_months)
+    expired = sorted(name for name, month in list_partitions(conn, schema, table_name).items() if month < oldest)
+    for name in expired:
+        conn.execute(text(f"ALTER TABLE {schema}.{table_name} DETACH PARTITION {schema}.{name}"))
+        if not detach_only:
+            conn.execute(text(f"DROP TABLE {schema}.{name}"))
+    if _relkind(conn, schema, f"{table_name}_default") is not None:
+        conn.execute(text(f"DELETE FROM {schema}.{table_name}_default "
+                          f"WHERE {TABLES[table]['partition_by']} < {_month_bound(oldest, _is_epoch(table))}"))
+    return expired
+
+def maintain_partitions(schema='raw_data', tables=None, detach_only=False, now=None):
+    """Create upcoming partitions and retire expired ones for each existing pipeline table
+
+    Meant to run on a schedule (the DAG runs it before every load).
+    Returns {table: (created, expired)}.
+    """
+    results = {}
+    with get_engine().begin() as conn:
+        for table in tables or TABLES:
+            if _relkind(conn, schema, table) != 'p':
+                continue
+            created = create_partitions(conn, table, schema, now=now)
+            expired = drop_expired_partitions(conn, table, schema, detach_only=detach_only, now=now)
+            results[table] = (created, expired)
+            print(f"{schema}.{table}: created partitions {created or 'none'}, "
+                  f"{'detached' if detach_only else 'dropped'} {expired or 'none'}")
+    return results
+
+def table_frame(df, table):
+    """Select the columns of df that table has, in table order, as plain Python values
+
+    List values (e.g. tweet hashtags) are stored as comma-separated text.
+    """
+    columns = [col for col in table_columns(table) if col in df.columns]
+    df = df[columns].copy()
+    for col in columns:
+        if df[col].dtype == object and df[col].map(lambda value: isinstance(value, (list, tuple))).any():
+            df[col] = df[col].map(lambda value: ",".join(value) if isinstance(value, (list, tuple)) else value)
+    return df
+
+class DataFrameCSVReader(io.TextIOBase):
+    """File-like reader that serializes a DataFrame to CSV one slice at a time
+
+    COPY ... FROM STDIN pulls data through read(), so only the current slice
+    of rows is ever held as CSV text.
+    """
+
+    def __init__(self, df, chunk_size=10000):
+        self._df = df
+        self._chunk_size = chunk_size
+        self._position = 0
+        self._buffer = ''
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self):
+        chunk = self._df.iloc[self._position:self._position + self._chunk_size]
+        self._position += self._chunk_size
+        # Quote strings so empty text loads as '' rather than NULL
+        return chunk.to_csv(header=False, index=False, quoting=csv.QUOTE_NONNUMERIC)
+
+    def read(self, size=-1):
+        while (size < 0 or len(self._buffer) < size) and self._position < len(self._df):
+            self._buffer += self._next_chunk()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def copy_dataframe(conn, df, schema, table_name, chunk_size=10000):
+    """Stream a DataFrame into an existing table with COPY ... FROM STDIN"""
+    columns = ", ".join(df.columns)
+    # Missing values (text or numbers, e.g. fast mode's TextBlob scores) are
+    # written as quoted "" like empty strings; load those back as NULL
+    nullable = [col for col in df.columns if df[col].isna().any()]
+    force_null = f", FORCE_NULL ({', '.join(nullable)})" if nullable else ""
+    copy_sql = f"COPY {schema}.{table_name} ({columns}) FROM STDIN WITH (FORMAT csv{force_null})"
+    # COPY needs the raw DBAPI (psycopg2) cursor
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(copy_sql, DataFrameCSVReader(df, chunk_size))
+
+def insert_values(conn, df, schema, table_name, page_size=VALUES_PAGE_SIZE, conflict_key=None):
+    """Insert a DataFrame with multi-row INSERT ... VALUES statements of page_size rows
+
+    With conflict_key (a list of columns with a unique index), rows whose
+    key already exists update the stored row instead (the DataFrame must not
+    repeat a key within one page).
+    """
+    from psycopg2.extras import execute_values
+
+    columns = list(df.columns)
+    sql = f"INSERT INTO {schema}.{table_name} ({', '.join(columns)}) VALUES %s"
+    if conflict_key is not None:
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col not in conflict_key)
+        sql += f" ON CONFLICT ({', '.join(conflict_key)}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+    # NaN/NaT become NULL
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    with conn.connection.cursor() as cursor:
+        execute_values(cursor, sql, rows, page_size=page_size)
+
+def insert_dataframe(conn, df, schema, table_name, method='copy'):
+    """Append a DataFrame to an existing table with COPY, batched INSERTs or pandas to_sql"""
+    if method == 'copy':
+        copy_dataframe(conn, df, schema, table_name)
+    elif method == 'values':
+        insert_values(conn, df, schema, table_name)
+    elif method == 'to_sql':
+        # Use pandas to_sql to insert data
+        df.to_sql(
+            name=table_name,
+            schema=schema,
+            con=conn,
+            if_exists='append',
+            index=False,
+            method='multi',
+            chunksize=1000
+        )
+    else:
+        raise ValueError(f"Unknown load method: {method}")
+
+def write_table(df, table, schema='raw_data', table_name=None, method='copy', upsert=False, conn=None):
+    """Append the table's columns of df to one of the pipeline TABLES
+
+    Creates the table and the partitions the rows fall into if needed. With
+    upsert=True, rows whose key is already stored update it instead, through
+    batched INSERT ... ON CONFLICT whatever the method (the table needs a
+    unique index on the key, which the tweet tables have). Tables with
+    sentiment rollups (see sentiment_rollups.ROLLUPS) get them updated for
+    the written rows. Runs in its own transaction unless an open connection
+    is passed in. Returns the number of rows written.
+    """
+    if conn is None:
+        with get_engine().begin() as conn:
+            return write_table(df, table, schema, table_name, method, upsert, conn)
+    table_name = table_name or table
+    df = table_frame(df, table)
+    create_table(conn, table, schema, table_name)
+    start, end = value_range(df[TABLES[table]['partition_by']]) if len(df) else (None, None)
+    create_partitions(conn, table, schema, table_name, start=start, end=end)
+    if upsert:
+        # One statement cannot update the same row twice; the last version wins
+        df = df.drop_duplicates(subset=table_key(table), keep='last')
+    
+    # Imported here, sentiment_rollups builds on this module
+    from sentiment_rollups import ROLLUPS, apply_rollups, create_rollup_tables
+    keys_table = None
+    if table in ROLLUPS and len(df):
+        create_rollup_tables(conn, table, schema, table_name)
+        # The written keys, for taking the replaced rows out of the rollups and adding the new ones
+        keys_table = f"{table_name}_written_keys"
+        key_types = dict(TABLES[table]['columns'])
+        conn.execute(text(f"DROP TABLE IF EXISTS pg_temp.{keys_table}"))
+        conn.execute(text(f"CREATE TEMP TABLE {keys_table} "
+                          f"({', '.join(f'{col} {key_types[col]}' for col in table_key(table))}) ON COMMIT DROP"))
+        copy_dataframe(conn, df[table_key(table)], 'pg_temp', keys_table)
+        apply_rollups(conn, table, schema, table_name, f"pg_temp.{keys_table}", sign=-1)
+    if upsert:
+        insert_values(conn, df, schema, table_name, conflict_key=table_key(table))
+    else:
+        insert_dataframe(conn, df, schema, table_name, method)
+    if keys_table is not None:
+        apply_rollups(conn, table, schema, table_name, f"pg_temp.{keys_table}", sign=1)
+    return len(df)
@@ -0,0 +1,172 @@
+# scripts/extraction_scheduler.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+import requests
+
+from file_io import RAW_COMMENT_SCHEMA, RAW_TWEET_SCHEMA, to_arrow
+from reddit_extraction import fetch_reddit_comments, get_reddit_client
+from data_extraction_new import authenticate_twitter, extract_tweets
+
+# Default request budgets per source. Reddit's OAuth API allows 100 requests
+# per minute per client; Twitter's recent search allows 450 per 15 minutes.
+REDDIT_REQUESTS_PER_MINUTE = float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '100'))
+TWITTER_REQUESTS_PER_MINUTE = float(os.getenv('TWITTER_REQUESTS_PER_MINUTE', '30'))
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` requests per `per` seconds"""
+
+    def __init__(self, rate, per=60.0, burst=None):
+        self.interval = per / rate
+        self.capacity = burst if burst is not None else max(1.0, rate / 10)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+class RateLimitedSession(requests.Session):
+    """requests session that takes a token from a RateLimiter before every request
+
+    Both praw and tweepy send their HTTP traffic through a requests session,
+    so one of these per client enforces the budget of that source no matter
+    how many threads share the client.
+    """
+
+    def __init__(self, limiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def request(self, *args, **kwargs):
+        self.limiter.acquire()
+        return super().request(*args, **kwargs)
+
+class ColumnarBuffer:
+    """Thread-safe buffer collecting row batches as Arrow record batches"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._batches = []
+        self._lock = threading.Lock()
+
+    def append(self, rows):
+        if not rows:
+            return
+        batch = to_arrow(pd.DataFrame.from_records(rows), self.schema)
+        with self._lock:
+            self._batches.append(batch)
+
+    def to_table(self):
+        with self._lock:
+            return pa.concat_tables(self._batches) if self._batches else self.schema.empty_table()
+
+    def to_frame(self):
+        return self.to_table().to_pandas()
+
+def make_reddit_client(requests_per_minute=REDDIT_REQUESTS_PER_MINUTE, **config):
+    """Authenticated Reddit client whose requests share one rate limit"""
+    session = RateLimitedSession(RateLimiter(requests_per_minute))
+    return get_reddit_client(session=session, **config)
+
+def make_twitter_client(requests_per_minute=TWITTER_REQUESTS_PER_MINUTE):
+    """Authenticated Twitter client whose requests share one rate limit"""
+    client = authenticate_twitter()
+    client.session = RateLimitedSession(RateLimiter(requests_per_minute))
+    return client
+
+def run_jobs(jobs, max_workers=8):
+    """Run (name, fetch, buffer) jobs concurrently, appending each result to its buffer
+
+    A failing job is reported and skipped so the other sources still complete.
+    Returns the names of the jobs that failed.
+    """
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch): (name, buffer) for name, fetch, buffer in jobs}
+        for future in as_completed(futures):
+            name, buffer = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"Extraction failed for {name}: {e}")
+                failed.append(name)
+                continue
+            buffer.append(rows)
+            print(f"Extracted {len(rows)} rows for {name}")
+    return failed
+
+def extract_sources(subreddits=(), search_terms=(), reddit_limit=100, tweet_count=10,
+                    max_workers=8, reddit=None, twitter=None, state=None, sinks=None):
+    """Fetch many subreddits and search terms at once
+
+    Each source gets one shared, rate-limited client (created on demand if not
+    passed in), so the wall-clock time approaches that of the slowest source
+    rather than the sum of all of them. With an ExtractionState, only items
+    newer than each subreddit's/query's high-water mark are fetched; advancing
+    the marks is left to the caller once the results are safely written.
+    reddit_limit only caps subreddits without a mark; the others are paged
+    back to their mark (see reddit_extraction.fetch_reddit_comments).
+    Returns a dict with a 'reddit' and a 'twitter' DataFrame, without
+    duplicate ids. If any source failed, RuntimeError is raised once the
+    others have finished.
+
+    sinks maps 'reddit' and/or 'twitter' to a raw_sink.RawSink. Rows of
+    those sources go into the sink as each fetch completes instead of being
+    collected in memory, and their DataFrame only holds the sink's key
+    columns of the rows it took (enough to advance the marks once the sink
+    is closed).
+    """
+    sinks = sinks or {}
+    reddit_buffer = sinks.get('reddit') or ColumnarBuffer(RAW_COMMENT_SCHEMA)
+    twitter_buffer = sinks.get('twitter') or ColumnarBuffer(RAW_TWEET_SCHEMA)
+    jobs = []
+    if subreddits:
+        reddit = reddit or make_reddit_client()
+        for subreddit in subreddits:
+            mark = state.get('reddit', subreddit) if state is not None else None
+            jobs.append((f"r/{subreddit}",
+                         lambda subreddit=subreddit, mark=mark: fetch_reddit_comments(reddit, subreddit, reddit_limit, mark),
+                         reddit_buffer))
+    if search_terms:
+        if twitter is None:
+            try:
+                twitter = make_twitter_client()
+            except ValueError as e:
+                # extract_tweets falls back to mock data without credentials
+                print(f"Twitter client unavailable: {e}")
+        for term in search_terms:
+            mark = state.get('twitter', term) if state is not None else None
+            since_id = mark['last_id'] if mark is not None else None
+            jobs.append((f"twitter:{term}",
+                         lambda term=term, since_id=since_id: extract_tweets(
+                             term, tweet_count, client=twitter, since_id=since_id).to_dict('records'),
+                         twitter_buffer))
+
+    failed = run_jobs(jobs, max_workers)
+    if failed:
+        # A partial result would look complete; fail so the caller retries every source
+        raise RuntimeError(f"Extraction failed for {', '.join(sorted(failed))}")
+
+    def result(buffer):
+        if isinstance(buffer, ColumnarBuffer):
+            # The same item can show up under several subreddits/queries or pages
+            return buffer.to_frame().drop_duplicates(subset='id', ignore_index=True)
+        # Sinks drop repeated ids as they write
+        return buffer.written_keys()
+
+    return {'reddit': result(reddit_buffer), 'twitter': result(twitter_buffer)}
@@ -0,0 +1,96 @@
+# scripts/extraction_state.py
+import json
+import os
+import sqlite3
+import time
+
+# The columns advance_reddit and advance_twitter read, e.g. what a RawSink
+# has to keep of the rows it writes
+MARK_COLUMNS = {
+    'reddit': ['id', 'created_utc', 'subreddit'],
+    'twitter': ['id', 'search_query'],
+}
+
+class ExtractionState:
+    """High-water marks of already extracted items, kept in a local SQLite file
+
+    One mark is kept per (source, key), e.g. ('reddit', 'news') or
+    ('twitter', 'climate change'). Reddit marks hold the newest created_utc
+    seen plus the ids seen at that exact second; Twitter marks hold the
+    newest tweet id, which the API accepts as since_id. Marks only move
+    forward.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # Each mapped extract task advances its own marks; they wait on each
+        # other's writes rather than failing with "database is locked"
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_state (
+            source TEXT,
+            key TEXT,
+            last_created_utc REAL,
+            last_id TEXT,
+            boundary_ids TEXT,
+            updated_at REAL,
+            PRIMARY KEY (source, key)
+        )
+        """)
+        self._conn.commit()
+
+    def get(self, source, key):
+        """Return the mark for (source, key) as a dict, or None if nothing was extracted yet"""
+        row = self._conn.execute(
+            "SELECT last_created_utc, last_id, boundary_ids FROM extraction_state WHERE source = ? AND key = ?",
+            (source, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'created_utc': row[0],
+            'last_id': row[1],
+            'boundary_ids': set(json.loads(row[2] or '[]')),
+        }
+
+    def _set(self, source, key, created_utc, last_id, boundary_ids):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extraction_state VALUES (?, ?, ?, ?, ?, ?)",
+            (source, key, created_utc, last_id, json.dumps(sorted(boundary_ids)), time.time())
+        )
+
+    def advance_reddit(self, df):
+        """Move each subreddit's mark to the newest comments in df"""
+        if df.empty:
+            return
+        for subreddit, comments in df.groupby('subreddit'):
+            newest = comments['created_utc'].max()
+            newest_ids = set(comments.loc[comments['created_utc'] == newest, 'id'])
+            mark = self.get('reddit', subreddit)
+            if mark is not None and mark['created_utc'] is not None:
+                if newest < mark['created_utc']:
+                    continue
+                if newest == mark['created_utc']:
+                    newest_ids |= mark['boundary_ids']
+            self._set('reddit', subreddit, float(newest), max(newest_ids), newest_ids)
+        self._conn.commit()
+
+    def advance_twitter(self, df):
+        """Move each search query's mark to the newest tweet id in df"""
+        if df.empty:
+            return
+        for query, tweets in df.groupby('search_query'):
+            # Mock tweets have non-numeric ids and never advance the mark
+            ids = [int(tweet_id) for tweet_id in tweets['id'] if str(tweet_id).isdigit()]
+            if not ids:
+                continue
+            mark = self.get('twitter', query)
+            if mark is not None and mark['last_id'] is not None and max(ids) <= int(mark['last_id']):
+                continue
+            self._set('twitter', query, None, str(max(ids)), set())
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
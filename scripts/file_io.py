@@ -0,0 +1,177 @@
+# scripts/file_io.py
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Fixed schema of raw Reddit comments as extracted
+RAW_COMMENT_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('body', pa.string()),
+    ('created_utc', pa.int64()),
+    ('score', pa.int64()),
+    ('subreddit', pa.string()),
+])
+
+# The cleaned text and sentiment scores added to raw rows. Scores are
+# float32 and the category is dictionary-encoded, matching the in-memory
+# representation, and read back as float32 columns and a Categorical.
+SENTIMENT_FIELDS = [
+    ('cleaned_text', pa.string()),
+    ('vader_compound', pa.float32()),
+    ('vader_positive', pa.float32()),
+    ('vader_negative', pa.float32()),
+    ('vader_neutral', pa.float32()),
+    ('textblob_polarity', pa.float32()),
+    ('textblob_subjectivity', pa.float32()),
+    ('sentiment_category', pa.dictionary(pa.int8(), pa.string())),
+    # Id of the representative comment when near-duplicate detection ran, else null
+    ('duplicate_cluster_id', pa.string()),
+]
+
+# Raw comments plus their sentiment
+PROCESSED_COMMENT_SCHEMA = pa.schema(list(RAW_COMMENT_SCHEMA) + SENTIMENT_FIELDS)
+
+# Fixed schema of raw tweets as extracted
+RAW_TWEET_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('created_at', pa.string()),
+    ('text', pa.string()),
+    ('user_name', pa.string()),
+    ('user_location', pa.string()),
+    ('retweet_count', pa.int64()),
+    ('favorite_count', pa.int64()),
+    ('hashtags', pa.list_(pa.string())),
+    ('search_query', pa.string()),
+])
+
+# Raw tweets plus their sentiment
+PROCESSED_TWEET_SCHEMA = pa.schema(list(RAW_TWEET_SCHEMA) + SENTIMENT_FIELDS)
+
+def is_parquet(path):
+    """Intermediate files are Parquet unless they have a .csv (or gzipped .csv.gz) extension"""
+    return not str(path).endswith(('.csv', '.csv.gz'))
+
+def file_columns(path):
+    """Column names of a Parquet or CSV file, without reading its rows"""
+    if is_parquet(path):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def raw_schemas(path):
+    """(raw schema, processed schema) of a raw file: tweets if it has a 'text' column, else comments"""
+    if 'text' in file_columns(path):
+        return RAW_TWEET_SCHEMA, PROCESSED_TWEET_SCHEMA
+    return RAW_COMMENT_SCHEMA, PROCESSED_COMMENT_SCHEMA
+
+def to_arrow(df, schema):
+    """Convert a DataFrame to an Arrow table with exactly the given schema
+
+    Columns missing from the frame are written as nulls and extra columns are
+    dropped; whole-number floats (e.g. Reddit's created_utc) become integers.
+    """
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            arrays.append(pa.array(df[field.name], type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_frame(df, path, schema):
+    """Write a DataFrame as Parquet with a fixed schema, or as CSV for .csv paths"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if is_parquet(path):
+        pq.write_table(to_arrow(df, schema), path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def read_frame(path, columns=None):
+    """Read a Parquet or CSV file, loading only the requested columns if given"""
+    if is_parquet(path):
+        if columns is not None:
+            # Project onto the columns the file actually has
+            available = pq.read_schema(path).names
+            columns = [col for col in columns if col in available]
+        return pq.read_table(path, columns=columns).to_pandas()
+    usecols = (lambda col: col in columns) if columns is not None else None
+    return pd.read_csv(path, usecols=usecols)
+
+def iter_frames(path, chunk_size, columns=None):
+    """Yield a Parquet or CSV file as DataFrames of at most chunk_size rows"""
+    if is_parquet(path):
+        parquet_file = pq.ParquetFile(path)
+        if columns is not None:
+            columns = [col for col in columns if col in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        usecols = (lambda col: col in columns) if columns is not None else None
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+
+class FrameWriter:
+    """Append DataFrames to a single Parquet (fixed schema) or CSV file"""
+
+    def __init__(self, path, schema):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._parquet_writer = pq.ParquetWriter(path, schema) if is_parquet(path) else None
+
+    def write(self, df):
+        if self._parquet_writer is not None:
+            # Each chunk becomes its own row group
+            self._parquet_writer.write_table(to_arrow(df, self.schema))
+        else:
+            # Write the header with the first chunk only, then append
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a',
+                      header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif self.rows == 0:
+            # Leave an empty file behind, as a one-shot write would
+            open(self.path, 'w').close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_shards(paths, output_dir, shard_size, schema, file_format='parquet'):
+    """Re-split input files into shards of exactly shard_size rows (the last may be smaller)
+
+    Rows are streamed, so only about one shard is held in memory. Shards are
+    written to output_dir as shard_00000.<file_format>, shard_00001... and
+    their paths returned in order. Without any rows, a single empty shard is
+    written so downstream steps still have one file to work on.
+    """
+    shard_paths = []
+    pending = None
+
+    def write_shard(df):
+        path = os.path.join(output_dir, f"shard_{len(shard_paths):05d}.{file_format}")
+        shard_paths.append(write_frame(df.reset_index(drop=True), path, schema))
+
+    for path in paths:
+        columns = schema.names if is_parquet(path) else None
+        for frame in iter_frames(path, shard_size, columns=columns):
+            pending = frame if pending is None else pd.concat([pending, frame], ignore_index=True)
+            while len(pending) >= shard_size:
+                write_shard(pending.iloc[:shard_size])
+                pending = pending.iloc[shard_size:]
+    if pending is not None and len(pending) > 0 or not shard_paths:
+        write_shard(pending if pending is not None else pd.DataFrame(columns=schema.names))
+    return shard_paths
+
+def export_csv(path, csv_path, columns=None):
+    """Export a Parquet intermediate file to CSV"""
+    df = read_frame(path, columns)
+    os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+    df.to_csv(csv_path, index=False)
+    return csv_path
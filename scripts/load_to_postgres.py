@@ -1,94 +1,216 @@
+import math
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
-import io
+from sqlalchemy import text
+from database import create_partitions, create_table, get_engine, insert_dataframe, table_columns, table_key, value_range
+from file_io import read_frame
+from sentiment_rollups import apply_rollups, create_rollup_tables, lock_rollups, rebuild_rollups
+from task_metrics import file_size, instrumented, record
 
-def load_processed_to_postgres(**kwargs):
-    """Load processed Reddit comments CSV into PostgreSQL database"""
-    # Get the processed file path from XCom
-    ti = kwargs['ti']
-    processed_file = ti.xcom_pull(task_ids='analyze_sentiment')
-    
-    # Database connection details
-    db_user = os.getenv('POSTGRES_USER', 'airflow')
-    db_pass = os.getenv('POSTGRES_PASSWORD', 'airflow')
-    db_host = os.getenv('POSTGRES_HOST', 'postgres')
-    db_name = os.getenv('POSTGRES_DB', 'airflow')
-    db_port = os.getenv('POSTGRES_PORT', '5432')
-    table_name = 'processed_reddit_comments'
-    schema = 'raw_data'
+# Columns loaded into the processed comments table, in table order (loaded_at is set by the database)
+PROCESSED_COLUMNS = [col for col in table_columns('processed_reddit_comments') if col != 'loaded_at']
 
-    # Create database connection
-    connection_string = f'postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}'
-    engine = create_engine(connection_string)
-    
-    # Read the processed CSV file
-    df = pd.read_csv(processed_file)
-    print(f"Loaded CSV with {len(df)} rows and columns: {list(df.columns)}")
-    
-    # Clean and prepare the data
+def prepare_processed_frame(df):
+    """Clean up a processed comments DataFrame and select the table columns"""
     # Convert created_utc to integer (it's currently float)
     if 'created_utc' in df.columns:
         df['created_utc'] = df['created_utc'].fillna(0).astype(int)
     
     # Fill NaN values in text columns
-    text_columns = ['id', 'body', 'cleaned_text', 'sentiment_category']
+    text_columns = ['id', 'body', 'cleaned_text', 'sentiment_category', 'subreddit']
     for col in text_columns:
         if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # fillna only accepts existing categories
+                df[col] = df[col].astype(object)
             df[col] = df[col].fillna('')
     
-    # Fill NaN values in numeric columns
+    # Fill NaN values in the VADER columns. The TextBlob ones stay NaN and load
+    # as NULL: the fast backend skips TextBlob, and zeros would skew its averages
     numeric_columns = ['vader_compound', 'vader_positive', 'vader_negative', 'vader_neutral', 
                       'textblob_polarity', 'textblob_subjectivity']
     for col in numeric_columns:
         if col in df.columns:
-            df[col] = df[col].fillna(0.0)
-    
-    # Select only the columns we want to insert
-    columns_to_insert = ['id', 'created_utc', 'body', 'cleaned_text', 'vader_compound', 
-                        'vader_positive', 'vader_negative', 'vader_neutral', 
-                        'textblob_polarity', 'textblob_subjectivity', 'sentiment_category']
+            if not col.startswith('textblob_'):
+                df[col] = df[col].fillna(0.0)
+            if df[col].dtype == 'float32':
+                # Scores lie in [-1, 1], where float32 holds ~7 decimals; rounding
+                # there stores 0.5106 in the FLOAT column instead of 0.5105999708175659
+                df[col] = df[col].astype('float64').round(7)
     
     # Filter DataFrame to only include columns that exist
-    existing_columns = [col for col in columns_to_insert if col in df.columns]
-    df_to_insert = df[existing_columns].copy()
+    existing_columns = [col for col in PROCESSED_COLUMNS if col in df.columns]
+    return df[existing_columns].copy()
+
+def create_processed_table(conn, schema, table_name):
+    """Drop and recreate the processed comments table"""
+    create_table(conn, 'processed_reddit_comments', schema, table_name, replace=True)
+    create_rollup_tables(conn, 'processed_reddit_comments', schema, table_name)
+
+def ensure_incremental_tables(conn, schema, table_name):
+    """Create the persistent table, its unlogged staging table and its rollups"""
+    create_table(conn, 'processed_reddit_comments', schema, table_name)
+    # ON CONFLICT needs a unique index, also on tables created by a full reload;
+    # on a partitioned table it has to include the partition column
+    key = table_key('processed_reddit_comments')
+    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_{'_'.join(key)}_key "
+                      f"ON {schema}.{table_name} ({', '.join(key)})"))
+    create_table(conn, 'processed_reddit_comments', schema, f"{table_name}_staging", unlogged=True)
+    # Tables created before near-duplicate detection, rollups and loaded_at existed lack their columns
+    for table in (table_name, f"{table_name}_staging"):
+        conn.execute(text(f"ALTER TABLE {schema}.{table} ADD COLUMN IF NOT EXISTS duplicate_cluster_id VARCHAR(255)"))
+        conn.execute(text(f"ALTER TABLE {schema}.{table} ADD COLUMN IF NOT EXISTS subreddit VARCHAR(255)"))
+        conn.execute(text(f"ALTER TABLE {schema}.{table} "
+                          f"ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"))
+    create_rollup_tables(conn, 'processed_reddit_comments', schema, table_name)
+
+def merge_staging(conn, schema, table_name, columns):
+    """Upsert the staged rows that are new or changed into the persistent table and update its rollups
+
+    Staged rows identical to the stored ones (in columns) are skipped, so
+    reloading a batch only writes and re-aggregates the rows that differ.
+    The rows written get a new loaded_at, which downstream models read
+    incrementally. Returns the rows merged.
+    """
+    column_list = ", ".join(columns)
+    key = table_key('processed_reddit_comments')
+    values = [col for col in columns if col not in key]
+    updates = ", ".join([f"{col} = EXCLUDED.{col}" for col in values] + ["loaded_at = CURRENT_TIMESTAMP"])
+    changed = f"{table_name}_changed"
+    # Held until commit, so no other load changes the rows between the diff and the upsert
+    lock_rollups(conn, schema, table_name)
+    conn.execute(text(f"DROP TABLE IF EXISTS pg_temp.{changed}"))
+    difference = (f"OR ({', '.join(f'stored.{col}' for col in values)}) "
+                  f"IS DISTINCT FROM ({', '.join(f'staged.{col}' for col in values)})") if values else ""
+    # A batch may repeat an id; keep its newest version so each row is touched once
+    conn.execute(text(f"""
+    CREATE TEMP TABLE {changed} ON COMMIT DROP AS
+    SELECT staged.* FROM (
+        SELECT DISTINCT ON (id) {column_list}
+        FROM {schema}.{table_name}_staging
+        ORDER BY id, created_utc DESC
+    ) staged
+    LEFT JOIN {schema}.{table_name} stored
+        ON stored.id = staged.id AND stored.created_utc = staged.created_utc
+    WHERE stored.id IS NULL {difference}
+    """))
+    # Take the rows about to be replaced out of the rollups, and add them back as merged
+    apply_rollups(conn, 'processed_reddit_comments', schema, table_name, f"pg_temp.{changed}", sign=-1)
+    result = conn.execute(text(f"""
+    INSERT INTO {schema}.{table_name} ({column_list})
+    SELECT {column_list} FROM pg_temp.{changed}
+    ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}
+    """))
+    apply_rollups(conn, 'processed_reddit_comments', schema, table_name, f"pg_temp.{changed}", sign=1)
+    return result.rowcount
+
+def existing_ids(conn, df, schema='raw_data', table_name='processed_reddit_comments'):
+    """The ids of df's comments that are already stored in table_name"""
+    if df.empty:
+        return set()
+    # Bounding created_utc lets the lookup skip the partitions the batch cannot be in
+    start, end = value_range(df['created_utc'])
+    return set(conn.execute(text(f"""
+    SELECT id FROM {schema}.{table_name}
+    WHERE created_utc BETWEEN :start AND :end AND id = ANY(:ids)
+    """), {'start': math.floor(start), 'end': math.ceil(end), 'ids': [str(i) for i in df['id']]}).scalars())
+
+def merge_processed_frame(conn, df, method='copy', schema='raw_data', table_name='processed_reddit_comments'):
+    """Upsert one processed DataFrame into table_name through its staging table
+    
+    The tables must exist (see ensure_incremental_tables). The upsert on
+    (id, created_utc) stores each comment once. Returns the rows merged.
+    """
+    conn.execute(text(f"TRUNCATE {schema}.{table_name}_staging"))
+    df = prepare_processed_frame(df)
+    if df.empty:
+        return 0
+    start, end = value_range(df['created_utc'])
+    create_partitions(conn, 'processed_reddit_comments', schema, table_name, start=start, end=end)
+    insert_dataframe(conn, df, schema, f"{table_name}_staging", method)
+    return merge_staging(conn, schema, table_name, list(df.columns))
+
+def load_processed_files(processed_files, method='copy', mode='incremental',
+                         schema='raw_data', table_name='processed_reddit_comments'):
+    """Load processed comments files (Parquet or CSV) into PostgreSQL in one transaction
+    
+    method='copy' streams the rows with COPY; method='values' sends batched
+    multi-row INSERTs and method='to_sql' does the same through pandas (see
+    database.insert_dataframe). Files are read and written one at a time, so
+    only one file is held in memory.
     
-    print(f"Prepared DataFrame with columns: {list(df_to_insert.columns)}")
-    print(f"DataFrame shape: {df_to_insert.shape}")
+    mode='incremental' stages the rows in an unlogged table and upserts them
+    on (id, created_utc); the table stays readable throughout. Every row of
+    the files is considered: extraction already skips comments it has seen
+    per subreddit, and the upsert absorbs any overlap, so late, edited or
+    newly added subreddits' comments are never dropped. Rows already stored
+    unchanged are skipped, so rerunning a load only writes what differs.
+    mode='replace' drops and rebuilds the table from these files alone.
+    """
+    if mode not in ('replace', 'incremental'):
+        raise ValueError(f"Unknown load mode: {mode}")
+    engine = get_engine()
     
-    # Create table if it doesn't exist
+    read_rows = 0
+    loaded_rows = 0
+    loaded_columns = []
     with engine.begin() as conn:
-        # Drop table if exists
-        conn.execute(text(f'DROP TABLE IF EXISTS {schema}.{table_name}'))
+        if mode == 'replace':
+            create_processed_table(conn, schema, table_name)
+            target = table_name
+        else:
+            ensure_incremental_tables(conn, schema, table_name)
+            conn.execute(text(f"TRUNCATE {schema}.{table_name}_staging"))
+            target = f"{table_name}_staging"
         
-        # Create table with proper column types
-        create_table_sql = f"""
-        CREATE TABLE {schema}.{table_name} (
-            id VARCHAR(255),
-            created_utc BIGINT,
-            body TEXT,
-            cleaned_text TEXT,
-            vader_compound FLOAT,
-            vader_positive FLOAT,
-            vader_negative FLOAT,
-            vader_neutral FLOAT,
-            textblob_polarity FLOAT,
-            textblob_subjectivity FLOAT,
-            sentiment_category VARCHAR(50)
-        )
-        """
-        conn.execute(text(create_table_sql))
+        for processed_file in processed_files:
+            # Read only the table columns from the processed file
+            df = read_frame(processed_file, columns=PROCESSED_COLUMNS)
+            print(f"Loaded {processed_file} with {len(df)} rows and columns: {list(df.columns)}")
+            read_rows += len(df)
+            
+            # Clean and prepare the data
+            df_to_insert = prepare_processed_frame(df)
+            
+            if 'created_utc' in df_to_insert.columns:
+                # Rows of months without a partition would land in the default one
+                start, end = value_range(df_to_insert['created_utc'])
+                create_partitions(conn, 'processed_reddit_comments', schema, table_name, start=start, end=end)
+            insert_dataframe(conn, df_to_insert, schema, target, method)
+            loaded_rows += len(df_to_insert)
+            loaded_columns += [col for col in df_to_insert.columns if col not in loaded_columns]
         
-        # Use pandas to_sql to insert data
-        df_to_insert.to_sql(
-            name=table_name,
-            schema=schema,
-            con=engine,
-            if_exists='append',
-            index=False,
-            method='multi',
-            chunksize=1000
-        )
+        if mode == 'incremental':
+            # Upsert only the columns the files had, so missing ones keep their values
+            loaded_rows = merge_staging(conn, schema, table_name,
+                                        [col for col in PROCESSED_COLUMNS if col in loaded_columns])
+        else:
+            rebuild_rollups(conn, 'processed_reddit_comments', schema, table_name)
+    
+    record(rows_in=read_rows, rows_out=loaded_rows,
+           bytes_read=sum(file_size(processed_file) for processed_file in processed_files))
+    print(f"Successfully loaded {loaded_rows} rows from {len(processed_files)} file(s) to {schema}.{table_name}")
+    return f"{schema}.{table_name}"
+
+def load_processed_file(processed_file, method='copy', mode='incremental',
+                        schema='raw_data', table_name='processed_reddit_comments'):
+    """Load a single processed comments file into PostgreSQL (see load_processed_files)"""
+    return load_processed_files([processed_file], method, mode, schema, table_name)
+
+@instrumented
+def load_processed_to_postgres(**kwargs):
+    """Load processed Reddit comments into PostgreSQL database
     
-    print(f"Successfully loaded {len(df_to_insert)} rows from {processed_file} to {schema}.{table_name}")
-    return f"{schema}.{table_name}" 
\ No newline at end of file
+    Loads the processed_files passed in (e.g. one per sentiment shard), or
+    else the file(s) returned by the sentiment task, in a single transaction.
+    """
+    processed_files = kwargs.get('processed_files')
+    if processed_files is None:
+        # Get the processed file path(s) from XCom
+        ti = kwargs['ti']
+        processed_files = ti.xcom_pull(task_ids=kwargs.get('sentiment_task_id', 'analyze_shard'))
+        if isinstance(processed_files, str):
+            processed_files = [processed_files]
+    method = kwargs.get('load_method', os.getenv('POSTGRES_LOAD_METHOD', 'copy'))
+    mode = kwargs.get('load_mode', os.getenv('POSTGRES_LOAD_MODE', 'incremental'))
+    return load_processed_files(processed_files, method=method, mode=mode)
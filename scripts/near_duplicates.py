@@ -0,0 +1,122 @@
+# scripts/near_duplicates.py
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 64 MinHash permutations split into 16 LSH bands of 4 rows. Texts whose
+# similarity is at or above ~0.5 very likely share a band; candidates are
+# then checked against the actual threshold, so the banding only needs to
+# be generous, not exact.
+NUM_PERM = 64
+BANDS = 16
+DEFAULT_THRESHOLD = 0.8
+
+_rng = np.random.default_rng(20250504)
+# Odd multipliers, so each (a * x + b) mod 2**32 is a permutation of 32-bit hashes
+_PERM_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+_PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+
+def _mix32(keys):
+    """Spread int64 keys over 32 bits (Fibonacci hashing)"""
+    return ((keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)).astype(np.uint32)
+
+def shingle_hashes(texts):
+    """Hash each text's word bigrams (or its single word) into 32 bits
+
+    texts is an Arrow string array. Returns the flat hash array, the row of
+    each hash (ascending) and the number of words per text; texts without
+    words get no hashes. Words are numbered per call, so hashes are only
+    comparable within one call.
+    """
+    words = pc.utf8_split_whitespace(texts)
+    flat = pc.list_flatten(words)
+    # Runs of whitespace split into empty strings, which are not words
+    is_word = pc.not_equal(flat, "")
+    rows = pc.list_parent_indices(words).filter(is_word).to_numpy()
+    counts = np.bincount(rows, minlength=len(texts))
+    word_ids = pc.dictionary_encode(flat.filter(is_word)).indices.to_numpy().astype(np.int64)
+    vocabulary = word_ids.max() + 1 if len(word_ids) else 0
+
+    # A bigram is a word and its successor within the same text; texts with
+    # one word contribute that word instead
+    is_bigram = np.concatenate([rows[:-1] == rows[1:], [False]])
+    keys = np.where(is_bigram, word_ids * vocabulary + np.roll(word_ids, -1), word_ids + vocabulary * vocabulary)
+    keep = is_bigram | (counts[rows] == 1)
+    return _mix32(keys[keep]), rows[keep], counts
+
+def minhash_signatures(texts):
+    """NUM_PERM MinHash values per text, as an (n, NUM_PERM) uint32 array
+
+    Texts without words all get the same signature.
+    """
+    hashes, rows, counts = shingle_hashes(texts)
+    signatures = np.full((len(counts), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_words = np.flatnonzero(counts > 0)
+    if len(has_words) == 0:
+        return signatures
+    offsets = np.searchsorted(rows, has_words)
+    for k in range(NUM_PERM):
+        # uint32 arithmetic wraps, i.e. is mod 2**32
+        permuted = hashes * _PERM_A[k] + _PERM_B[k]
+        signatures[has_words, k] = np.minimum.reduceat(permuted, offsets)
+    return signatures
+
+def _connected_components(n_rows, left, right):
+    """Label each row with the smallest row index connected to it by the edges"""
+    labels = np.arange(n_rows)
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smallest)
+        np.minimum.at(updated, right, smallest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+def _cluster_signatures(signatures, threshold):
+    """Representative position per signature row, from LSH candidates checked against threshold"""
+    n_rows = len(signatures)
+
+    rows_per_band = NUM_PERM // BANDS
+    left, right = [], []
+    for band in range(BANDS):
+        columns = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = columns[:, 0]
+        for k in range(1, rows_per_band):
+            keys = keys * np.uint64(0x100000001B3) ^ columns[:, k]
+        # Pair every text with the first text that landed in the same bucket
+        _, first, bucket = np.unique(keys, return_index=True, return_inverse=True)
+        first = first[bucket]
+        candidates = np.flatnonzero(first != np.arange(n_rows))
+        if len(candidates) == 0:
+            continue
+        similarity = (signatures[candidates] == signatures[first[candidates]]).mean(axis=1)
+        matched = candidates[similarity >= threshold]
+        left.append(matched)
+        right.append(first[matched])
+
+    if not left:
+        return np.arange(n_rows)
+    return _connected_components(n_rows, np.concatenate(left), np.concatenate(right))
+
+def find_near_duplicates(texts, threshold=DEFAULT_THRESHOLD):
+    """Cluster near-identical texts with MinHash/LSH
+
+    Returns, for every text, the position of its cluster's representative:
+    the earliest text of the cluster, or the text itself if it has no
+    near-duplicates. Texts count as near-duplicates when the MinHash estimate
+    of their word-bigram Jaccard similarity is at least threshold; clusters
+    are the connected components of that relation, so a flood of copies
+    that each differ a little ends up in one cluster even when two copies
+    differ more than the threshold allows. Runs in roughly linear time.
+    """
+    texts = pc.fill_null(pa.array(texts, type=pa.string(), from_pandas=True), "")
+    if len(texts) == 0:
+        return np.arange(0)
+    # Exact duplicates are clustered up front; only distinct texts are hashed
+    encoded = pc.dictionary_encode(texts)
+    text_ids = encoded.indices.to_numpy()
+    first_row = np.unique(text_ids, return_index=True)[1]
+    representative = _cluster_signatures(minhash_signatures(encoded.dictionary), threshold)
+    return first_row[representative][text_ids]
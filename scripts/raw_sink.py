@@ -0,0 +1,249 @@
+# scripts/raw_sink.py
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from file_io import to_arrow
+from task_metrics import record
+
+# Root of the raw landing area. Files go to {root}/{source}/date=YYYY-MM-DD/,
+# manifests to {root}/_manifests/{source}/.
+RAW_DATA_DIR = os.getenv('RAW_DATA_DIR', 'data/raw')
+# A file is closed and the next part started once it reaches about this size
+RAW_FILE_MAX_BYTES = int(os.getenv('RAW_FILE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Rows buffered before they are written out, as one Parquet row group
+RAW_BATCH_ROWS = int(os.getenv('RAW_BATCH_ROWS', '10000'))
+# Parquet codec; CSV files are always gzipped
+RAW_COMPRESSION = os.getenv('RAW_COMPRESSION', 'zstd')
+
+MANIFEST_DIR = '_manifests'
+
+def _safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value))
+
+class RawSink:
+    """Streams raw rows into compressed, size-rotated files partitioned by source and date
+
+    Rows are appended as they are extracted and written out every
+    batch_rows rows, so only one batch is held in memory. Files are
+    partitioned by the UTC date they were written on and a new part is
+    started once the current one reaches max_bytes. A file only appears
+    under its final name once it is complete. Rows repeating an id already
+    written are dropped.
+
+    close() writes a manifest listing every file of this sink, which is
+    what downstream tasks read instead of scanning the directories. If the
+    sink is left through an exception, its files are deleted and no
+    manifest is written, so a failed extraction leaves nothing behind.
+    """
+
+    def __init__(self, source, schema, run_id, name=None, root=RAW_DATA_DIR, file_format='parquet',
+                 max_bytes=RAW_FILE_MAX_BYTES, batch_rows=RAW_BATCH_ROWS, compression=RAW_COMPRESSION,
+                 key_columns=('id',)):
+        self.source = source
+        self.schema = schema
+        self.root = root
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.batch_rows = batch_rows
+        self.compression = compression
+        self.key_columns = list(key_columns)
+        self._key_schema = pa.schema([schema.field(col) for col in key_columns])
+        # Unique per sink, so a retried run never overwrites an earlier attempt's files
+        parts = [run_id, name, uuid.uuid4().hex[:8]]
+        self.prefix = "-".join(_safe_name(part) for part in parts if part is not None)
+        self.run_id = run_id
+        self.name = name
+        self.files = []
+        self.rows = 0
+        self._pending = []
+        self._seen = set()
+        self._keys = []
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def append(self, rows):
+        """Add a list of row dicts; writes a batch once batch_rows are pending"""
+        if not rows:
+            return
+        with self._lock:
+            accepted = []
+            for row in rows:
+                if row['id'] in self._seen:
+                    continue
+                self._seen.add(row['id'])
+                accepted.append(row)
+            if not accepted:
+                return
+            self._pending.extend(accepted)
+            self._keys.append(to_arrow(pd.DataFrame.from_records(accepted), self._key_schema))
+            if len(self._pending) >= self.batch_rows:
+                self._flush()
+
+    def write(self, df):
+        """Add the rows of a DataFrame"""
+        for start in range(0, len(df), self.batch_rows):
+            self.append(df.iloc[start:start + self.batch_rows].to_dict('records'))
+
+    def _flush(self):
+        if not self._pending:
+            return
+        table = to_arrow(pd.DataFrame.from_records(self._pending), self.schema)
+        self._pending = []
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        if self._writer is not None and self._writer.date != today:
+            self._close_file()
+        if self._writer is None:
+            self._open_file(today)
+        self._writer.write(table)
+        if self._writer.size() >= self.max_bytes:
+            self._close_file()
+
+    def _open_file(self, date):
+        extension = 'parquet' if self.file_format == 'parquet' else 'csv.gz'
+        directory = os.path.join(self.root, _safe_name(self.source), f"date={date}")
+        path = os.path.join(directory, f"{self.prefix}-{len(self.files):05d}.{extension}")
+        os.makedirs(directory, exist_ok=True)
+        if self.file_format == 'parquet':
+            self._writer = _ParquetPart(path, self.schema, self.compression)
+        else:
+            self._writer = _CsvPart(path)
+        self._writer.date = date
+
+    def _close_file(self):
+        writer, self._writer = self._writer, None
+        writer.close()
+        self.files.append({
+            'path': os.path.relpath(writer.path, self.root),
+            'date': writer.date,
+            'rows': writer.rows,
+            'bytes': os.path.getsize(writer.path),
+        })
+        self.rows += writer.rows
+
+    def written_keys(self):
+        """The key_columns of every row accepted so far, e.g. to advance extraction marks after close()"""
+        with self._lock:
+            keys = list(self._keys)
+        return (pa.concat_tables(keys) if keys else self._key_schema.empty_table()).to_pandas()
+
+    def close(self):
+        """Write out the pending rows and the manifest; returns the manifest's path"""
+        with self._lock:
+            self._flush()
+            if self._writer is not None:
+                self._close_file()
+        manifest = {
+            'source': self.source,
+            'run_id': self.run_id,
+            'name': self.name,
+            'format': self.file_format,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'rows': self.rows,
+            'bytes': sum(f['bytes'] for f in self.files),
+            'files': self.files,
+        }
+        path = os.path.join(self.root, MANIFEST_DIR, _safe_name(self.source), f"{self.prefix}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name first, so a manifest is never seen half-written
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        record(rows_out=self.rows, bytes_written=manifest['bytes'])
+        print(f"Wrote {self.rows} {self.source} rows to {len(self.files)} file(s), listed in {path}")
+        return path
+
+    def abort(self):
+        """Delete every file of this sink without writing a manifest"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.discard()
+                self._writer = None
+            for f in self.files:
+                os.remove(os.path.join(self.root, f['path']))
+            self.files = []
+            self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None:
+            self.abort()
+
+class _ParquetPart:
+    """One Parquet file being written, under a temporary name until closed"""
+
+    def __init__(self, path, schema, compression):
+        self.path = path
+        self.rows = 0
+        self._file = open(f"{path}.tmp", 'wb')
+        self._writer = pq.ParquetWriter(self._file, schema, compression=compression)
+
+    def write(self, table):
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def size(self):
+        return self._file.tell()
+
+    def close(self):
+        self._writer.close()
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def discard(self):
+        self._writer.close()
+        self._file.close()
+        os.remove(f"{self.path}.tmp")
+
+class _CsvPart:
+    """One gzipped CSV file being written, under a temporary name until closed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._file = open(f"{path}.tmp", 'wb')
+        self._text = io.TextIOWrapper(gzip.GzipFile(fileobj=self._file, mode='wb'), newline='')
+
+    def write(self, table):
+        df = table.to_pandas()
+        # List columns (tweet hashtags) as Python lists, as in the frames extraction returns
+        for field in table.schema:
+            if pa.types.is_list(field.type):
+                df[field.name] = df[field.name].map(lambda value: list(value) if value is not None else value)
+        df.to_csv(self._text, header=self.rows == 0, index=False)
+        self.rows += table.num_rows
+
+    def size(self):
+        # Compressed bytes written so far; gzip holds back at most one block
+        return self._file.tell()
+
+    def close(self):
+        self._text.close()
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def discard(self):
+        self._text.close()
+        self._file.close()
+        os.remove(f"{self.path}.tmp")
+
+def read_manifest(path):
+    """Load a manifest written by RawSink.close()"""
+    with open(path) as f:
+        return json.load(f)
+
+def manifest_files(manifest_path):
+    """Paths of the files a manifest lists, in the order they were written"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(manifest_path)))
+    return [os.path.join(root, f['path']) for f in read_manifest(manifest_path)['files']]
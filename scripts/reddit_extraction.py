@@ -1,28 +1,85 @@
 import praw
 import pandas as pd
 import os
+from datetime import datetime, timezone
+from file_io import RAW_COMMENT_SCHEMA
+from raw_sink import RawSink
 
-def extract_reddit_comments(subreddit_name='news', limit=100):
-    reddit = praw.Reddit(
+# Most comments read to catch up to a subreddit's high-water mark in one run
+REDDIT_CATCHUP_LIMIT = int(os.getenv('REDDIT_CATCHUP_LIMIT', '10000'))
+
+def get_reddit_client(session=None, **config):
+    """Create an authenticated Reddit client from the REDDIT_* environment variables
+    
+    A requests session can be passed in to control how HTTP requests are made
+    (e.g. rate limiting); extra config such as oauth_url/reddit_url is passed
+    through to praw.
+    """
+    requestor_kwargs = {'session': session} if session is not None else None
+    return praw.Reddit(
         client_id=os.getenv('REDDIT_CLIENT_ID'),
         client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
         user_agent=os.getenv('REDDIT_USER_AGENT'),
         username=os.getenv('REDDIT_USERNAME'),
-        password=os.getenv('REDDIT_PASSWORD')
+        password=os.getenv('REDDIT_PASSWORD'),
+        requestor_kwargs=requestor_kwargs,
+        **config
     )
+
+def comment_row(comment, subreddit_name):
+    """The raw comment columns of a praw comment"""
+    return {
+        'id': comment.id,
+        'body': comment.body,
+        'created_utc': comment.created_utc,
+        'score': comment.score,
+        'subreddit': subreddit_name
+    }
+
+def fetch_reddit_comments(reddit, subreddit_name='news', limit=100, mark=None, catchup_limit=REDDIT_CATCHUP_LIMIT):
+    """Fetch the latest comments of a subreddit as a list of row dicts
+    
+    Without a mark, the latest limit comments are fetched. With a
+    high-water mark from ExtractionState, paging goes on regardless of
+    limit until the first comment older than the mark, so nothing posted
+    since the last run is left behind, and comments already seen are
+    skipped. If the mark is not reached within catchup_limit comments or
+    before the listing ends, a warning says which comments may be missing.
+    """
     comments = []
-    for comment in reddit.subreddit(subreddit_name).comments(limit=limit):
-        comments.append({
-            'id': comment.id,
-            'body': comment.body,
-            'created_utc': comment.created_utc,
-            'score': comment.score,
-            'subreddit': subreddit_name
-        })
-    return pd.DataFrame(comments)
+    read = 0
+    reached_mark = mark is None
+    for comment in reddit.subreddit(subreddit_name).comments(limit=limit if mark is None else catchup_limit):
+        read += 1
+        if mark is not None:
+            # Listings are newest first, so everything after this was seen before
+            if comment.created_utc < mark['created_utc']:
+                reached_mark = True
+                break
+            if comment.created_utc == mark['created_utc'] and comment.id in mark['boundary_ids']:
+                continue
+        comments.append(comment_row(comment, subreddit_name))
+    if not reached_mark:
+        reason = (f"stopped at REDDIT_CATCHUP_LIMIT ({catchup_limit})" if read >= catchup_limit
+                  else "the listing ended")
+        oldest = min((row['created_utc'] for row in comments), default=None)
+        print(f"Warning: r/{subreddit_name} {reason} before reaching its high-water mark; comments "
+              f"between created_utc {mark['created_utc']} and {oldest} may be missing")
+    return comments
+
+def extract_reddit_comments(subreddit_name='news', limit=100, reddit=None, mark=None):
+    if reddit is None:
+        reddit = get_reddit_client()
+    return pd.DataFrame(fetch_reddit_comments(reddit, subreddit_name, limit, mark))
+
+def save_comments(df, output_path, file_format='parquet', run_id=None, name=None):
+    """Write comments under output_path through a RawSink; returns the path of its manifest
 
-def save_comments(df, output_path):
-    os.makedirs(output_path, exist_ok=True)
-    filename = os.path.join(output_path, "reddit_comments.csv")
-    df.to_csv(filename, index=False)
-    return filename 
\ No newline at end of file
+    Files are compressed and partitioned like the extract task's (see
+    raw_sink.RawSink), and never overwrite an earlier run's. run_id
+    defaults to the current UTC time.
+    """
+    run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    with RawSink('reddit', RAW_COMMENT_SCHEMA, run_id, name=name, root=output_path, file_format=file_format) as sink:
+        sink.write(df)
+        return sink.close()
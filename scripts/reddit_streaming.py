@@ -0,0 +1,287 @@
+# scripts/reddit_streaming.py
+import argparse
+import os
+import queue
+import signal
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from database import get_engine
+from file_io import RAW_COMMENT_SCHEMA
+from load_to_postgres import ensure_incremental_tables, existing_ids, merge_processed_frame
+from reddit_extraction import comment_row
+from sentiment_analysis import open_cache, process_frame, report_cache, start_scoring_pool
+from synthetic_data import DEFAULT_SUBREDDITS, generate_reddit_chunk
+
+# A micro-batch is scored and loaded once it holds STREAM_BATCH_SIZE comments
+# or its first comment has waited STREAM_FLUSH_SECONDS, whichever comes first
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '500'))
+STREAM_FLUSH_SECONDS = float(os.getenv('STREAM_FLUSH_SECONDS', '5'))
+# Comments waiting to be batched, and scored batches waiting to be loaded.
+# When either queue is full the stage feeding it blocks, back to the source.
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '10000'))
+STREAM_PENDING_BATCHES = int(os.getenv('STREAM_PENDING_BATCHES', '2'))
+# Ids remembered in memory to drop redelivered comments before they are scored
+STREAM_DEDUP_WINDOW = int(os.getenv('STREAM_DEDUP_WINDOW', '100000'))
+
+# Marks the end of the stream in the queues
+_DONE = object()
+
+class RecentIds:
+    """Bounded set of the ids seen most recently; the oldest are forgotten first"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._ids = OrderedDict()
+
+    def __contains__(self, comment_id):
+        return comment_id in self._ids
+
+    def add(self, comment_id):
+        self._ids[comment_id] = None
+        self._ids.move_to_end(comment_id)
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+
+def reddit_comment_stream(reddit, subreddits, retry_seconds=30):
+    """Yield raw comment rows from praw's comment stream of the subreddits, without end
+
+    Yields None whenever a poll found nothing new, so the consumer can act
+    on time while the stream is quiet. If the stream fails (network errors,
+    Reddit outages) it is reopened after retry_seconds; praw then delivers
+    the latest comments again, which stream_comments drops as duplicates.
+    """
+    subreddit = reddit.subreddit('+'.join(subreddits))
+    while True:
+        try:
+            for comment in subreddit.stream.comments(pause_after=0):
+                yield comment_row(comment, comment.subreddit.display_name) if comment is not None else None
+        except Exception as e:
+            print(f"Comment stream failed, reopening in {retry_seconds}s: {e}")
+            time.sleep(retry_seconds)
+
+def fake_comment_source(n_comments=None, rate=None, redelivery_rate=0.05, seed=0, subreddits=DEFAULT_SUBREDDITS,
+                        start_utc=None):
+    """Yield synthetic raw comment rows like reddit_comment_stream, for runs without Reddit
+
+    Stops after n_comments, or never if None, pacing itself to rate comments
+    per second if given. A redelivery_rate share of the rows repeats a recent
+    comment, as a reopened praw stream does. Each block of 1000 comments is
+    posted within a minute, starting at start_utc (default now); the same
+    seed and start_utc give the same comments.
+    """
+    start_utc = int(time.time()) if start_utc is None else start_utc
+    rng = np.random.default_rng(seed)
+    recent = deque(maxlen=1000)
+    started = time.monotonic()
+    emitted = 0
+    chunk_index = 0
+    while n_comments is None or emitted < n_comments:
+        chunk = generate_reddit_chunk(1000, seed=seed, chunk_index=chunk_index, start_row=chunk_index * 1000,
+                                      subreddits=subreddits, end_utc=start_utc + 60 * (chunk_index + 1),
+                                      span_seconds=60)
+        chunk_index += 1
+        for row in chunk.to_pylist():
+            if n_comments is not None and emitted >= n_comments:
+                return
+            if rate is not None:
+                time.sleep(max(0.0, started + emitted / rate - time.monotonic()))
+            if recent and rng.random() < redelivery_rate:
+                yield recent[rng.integers(len(recent))]
+            else:
+                recent.append(row)
+                yield row
+            emitted += 1
+
+class PostgresCommentSink:
+    """Loads scored micro-batches into processed_reddit_comments, each comment id once"""
+
+    def __init__(self, method='copy', schema='raw_data', table_name='processed_reddit_comments'):
+        self.method = method
+        self.schema = schema
+        self.table_name = table_name
+        with get_engine().begin() as conn:
+            ensure_incremental_tables(conn, schema, table_name)
+
+    def existing_ids(self, df):
+        """The ids of df's comments already stored, e.g. by an earlier run"""
+        with get_engine().connect() as conn:
+            return existing_ids(conn, df, self.schema, self.table_name)
+
+    def write(self, df):
+        """Upsert one scored batch in its own transaction; returns the rows written"""
+        with get_engine().begin() as conn:
+            return merge_processed_frame(conn, df, self.method, self.schema, self.table_name)
+
+def _put(target, item, alive):
+    """Put item on a bounded queue, waiting while it is full; False once alive() says its consumer is gone"""
+    while alive():
+        try:
+            target.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def stream_comments(source, sink, batch_size=STREAM_BATCH_SIZE, flush_seconds=STREAM_FLUSH_SECONDS,
+                    queue_size=STREAM_QUEUE_SIZE, pending_batches=STREAM_PENDING_BATCHES,
+                    dedup_window=STREAM_DEDUP_WINDOW, workers=1, cache_path=None,
+                    near_duplicate_threshold=None, backend='reference', stop=None):
+    """Score and load comments from source in micro-batches until it ends or stop is set
+
+    source yields raw comment rows (None when it has nothing new, see
+    reddit_comment_stream); sink stores scored batches (see
+    PostgresCommentSink). A reader thread, this thread (batching and
+    scoring with process_frame) and a loader thread are connected by
+    bounded queues, so a slow database slows the reading down instead of
+    piling up comments in memory.
+
+    Each comment is loaded once: ids seen in the last dedup_window comments
+    are dropped before scoring, ids the sink already stores are dropped
+    from each batch, and the sink's upsert on id absorbs whatever slips
+    through (e.g. a concurrent writer). On stop, the comments already read
+    are still scored and loaded. Returns counts of the comments received,
+    dropped as duplicates and loaded, and of the batches loaded.
+    """
+    stop = stop or threading.Event()
+    rows = queue.Queue(maxsize=queue_size)
+    batches = queue.Queue(maxsize=pending_batches)
+    stats = {'received': 0, 'duplicates': 0, 'loaded': 0, 'batches': 0}
+    failures = []
+
+    def read():
+        try:
+            for row in source:
+                if stop.is_set():
+                    break
+                if row is not None and not _put(rows, row, lambda: not stop.is_set()):
+                    break
+        except Exception as e:
+            failures.append(e)
+            stop.set()
+        _put(rows, _DONE, lambda: not stop.is_set())
+
+    def load():
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                return
+            try:
+                stats['loaded'] += sink.write(batch)
+            except Exception as e:
+                failures.append(e)
+                stop.set()
+                return
+            stats['batches'] += 1
+            lag = time.time() - batch['created_utc'].max()
+            print(f"Loaded batch {stats['batches']} with {len(batch)} comments, {lag:.0f}s after the newest was posted")
+
+    # The reader may block inside the source (e.g. a praw request), so it
+    # does not hold up shutdown
+    reader = threading.Thread(target=read, name='stream-reader', daemon=True)
+    loader = threading.Thread(target=load, name='stream-loader')
+    pool = start_scoring_pool(workers, backend) if workers > 1 else None
+    cache = open_cache(cache_path)
+    seen = RecentIds(dedup_window)
+    pending = []
+
+    def accept(row):
+        stats['received'] += 1
+        if row['id'] in seen:
+            stats['duplicates'] += 1
+            return
+        seen.add(row['id'])
+        pending.append(row)
+
+    def flush():
+        df = pd.DataFrame.from_records(pending, columns=RAW_COMMENT_SCHEMA.names)
+        pending.clear()
+        stored = sink.existing_ids(df)
+        if stored:
+            stats['duplicates'] += len(stored)
+            df = df[~df['id'].isin(stored)].reset_index(drop=True)
+        if df.empty:
+            return
+        scored = process_frame(df, workers, pool=pool, cache=cache,
+                               near_duplicate_threshold=near_duplicate_threshold, backend=backend)
+        _put(batches, scored, loader.is_alive)
+
+    reader.start()
+    loader.start()
+    deadline = None
+    try:
+        while loader.is_alive():
+            wait = 0.5 if deadline is None else min(0.5, max(0.0, deadline - time.monotonic()))
+            try:
+                row = rows.get(timeout=wait)
+            except queue.Empty:
+                row = None
+            done = row is _DONE or stop.is_set()
+            if row is not None and row is not _DONE:
+                accept(row)
+            if done:
+                # The reader has stopped; take what it left in the queue
+                while True:
+                    try:
+                        row = rows.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is not _DONE:
+                        accept(row)
+            if pending and deadline is None:
+                deadline = time.monotonic() + flush_seconds
+            if pending and (done or len(pending) >= batch_size or time.monotonic() >= deadline):
+                flush()
+                deadline = None
+            if done:
+                break
+    finally:
+        # Let the loader finish the batches already scored
+        _put(batches, _DONE, loader.is_alive)
+        loader.join()
+        if pool is not None:
+            pool.shutdown()
+        report_cache(cache)
+    if failures:
+        raise failures[0]
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuously score and load new Reddit comments in micro-batches")
+    parser.add_argument('--subreddits', default=os.getenv('REDDIT_SUBREDDITS', 'news'),
+                        help="Comma-separated subreddits to stream")
+    parser.add_argument('--fake', action='store_true', help="Stream synthetic comments instead of Reddit's")
+    parser.add_argument('--fake-rate', type=float, default=50.0, help="Synthetic comments per second")
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE)
+    parser.add_argument('--flush-seconds', type=float, default=STREAM_FLUSH_SECONDS)
+    args = parser.parse_args()
+
+    subreddits = [s.strip() for s in args.subreddits.split(',') if s.strip()]
+    if args.fake:
+        source = fake_comment_source(rate=args.fake_rate, subreddits=subreddits)
+    else:
+        # Imported here so that --fake runs need no Reddit credentials
+        from extraction_scheduler import make_reddit_client
+        source = reddit_comment_stream(make_reddit_client(), subreddits)
+
+    # Stop cleanly on Ctrl-C and on `docker stop`, loading the current batch first
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    threshold = os.getenv('NEAR_DUPLICATE_THRESHOLD')
+    stats = stream_comments(
+        source, PostgresCommentSink(method=os.getenv('POSTGRES_LOAD_METHOD', 'copy')),
+        batch_size=args.batch_size, flush_seconds=args.flush_seconds,
+        workers=int(os.getenv('SENTIMENT_WORKERS', '1')),
+        cache_path=os.getenv('SENTIMENT_CACHE_PATH', 'data/cache/sentiment_cache.sqlite'),
+        near_duplicate_threshold=float(threshold) if threshold else None,
+        backend=os.getenv('SENTIMENT_BACKEND', 'vectorized'), stop=stop)
+    print(f"Stream stopped: {stats}")
+
+if __name__ == "__main__":
+    main()
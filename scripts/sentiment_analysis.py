@@ -1,14 +1,27 @@
 # scripts/sentiment_analysis.py
+import os
+import hashlib
+import sqlite3
+import time
+from functools import partial
+from importlib.metadata import version
+import numpy as np
 import pandas as pd
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from textblob import TextBlob
 import re
+from concurrent.futures import ProcessPoolExecutor
+from file_io import FrameWriter, is_parquet, iter_frames, raw_schemas, read_frame
+from near_duplicates import find_near_duplicates
+from task_metrics import file_size, record
 
-# Download necessary NLTK resources
-nltk.download('vader_lexicon')
-nltk.download('punkt')
-nltk.download('stopwords')
+# NLTK data the analyzers need; fetched once by download_nltk_resources()
+# (run at image build time), never at import
+NLTK_RESOURCES = ['vader_lexicon']
+
+def download_nltk_resources():
+    """Download the NLTK data used by the analyzers, skipping what is already installed"""
+    import nltk
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource, quiet=True)
 
 def clean_text(text):
     """Clean and preprocess text data"""
@@ -25,6 +38,111 @@ def clean_text(text):
     text = text.lower().strip()
     return text
 
+# Precompiled cleaning patterns for clean_text_series. Mentions and hashtags
+# share one pass, as do special characters and digits; URLs keep their own
+# pass because merging them would change which of "@http..." matches first.
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+', flags=re.MULTILINE)
+MENTION_HASHTAG_PATTERN = re.compile(r'[@#]\w+')
+SPECIAL_DIGIT_PATTERN = re.compile(r'[^\w\s]|\d+')
+
+def clean_text_series(texts):
+    """Vectorized clean_text over a whole Series, with identical output"""
+    # Object dtype keeps the string methods on Python's str semantics
+    # (Arrow-backed strings lowercase some characters differently)
+    return (texts.astype(object)
+                 .str.replace(URL_PATTERN, '', regex=True)
+                 .str.replace(MENTION_HASHTAG_PATTERN, '', regex=True)
+                 .str.replace(SPECIAL_DIGIT_PATTERN, '', regex=True)
+                 .str.lower()
+                 .str.strip())
+
+# Columns produced by the sentiment scorers, in output order
+SENTIMENT_COLUMNS = [
+    'vader_compound', 'vader_positive', 'vader_negative', 'vader_neutral',
+    'textblob_polarity', 'textblob_subjectivity', 'sentiment_category'
+]
+SCORE_COLUMNS = SENTIMENT_COLUMNS[:-1]
+
+# sentiment_category is stored as int8 codes into these categories
+SENTIMENT_CATEGORY_DTYPE = pd.CategoricalDtype(['negative', 'neutral', 'positive'])
+CATEGORY_CODES = {category: code for code, category in enumerate(SENTIMENT_CATEGORY_DTYPE.categories)}
+
+# Neutral scores used when a text cannot be analyzed
+NEUTRAL_SENTIMENT = {
+    'vader_compound': 0.0,
+    'vader_positive': 0.0,
+    'vader_negative': 0.0,
+    'vader_neutral': 1.0,
+    'textblob_polarity': 0.0,
+    'textblob_subjectivity': 0.0,
+    'sentiment_category': 'neutral'
+}
+
+# How texts are scored: 'reference' runs nltk's VADER and TextBlob row by
+# row; 'vectorized' scores VADER for a whole batch at once with NumPy (within
+# vectorized_vader.TOLERANCE of nltk) and TextBlob row by row through a
+# leaner, exact path (see textblob_sentiment); 'fast' is 'vectorized'
+# without TextBlob, whose columns are left NaN
+SENTIMENT_BACKENDS = ('reference', 'vectorized', 'fast')
+
+# Analyzers shared by every call in this process (loaded on first use)
+_vader_analyzer = None
+_textblob_analyzer = None
+_vectorized_vader = None
+
+def get_analyzers():
+    """Return the process-wide VADER and TextBlob analyzers, loading them once"""
+    global _vader_analyzer, _textblob_analyzer
+    if _vader_analyzer is None:
+        # Imported here so that importing this module stays cheap
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        try:
+            _vader_analyzer = SentimentIntensityAnalyzer()
+        except LookupError:
+            # Not provisioned yet (e.g. a fresh dev environment)
+            print("VADER lexicon missing, downloading NLTK resources")
+            download_nltk_resources()
+            _vader_analyzer = SentimentIntensityAnalyzer()
+    if _textblob_analyzer is None:
+        from textblob.sentiments import PatternAnalyzer
+        # Same analyzer TextBlob(text).sentiment uses, without building a blob per row
+        _textblob_analyzer = PatternAnalyzer()
+    return _vader_analyzer, _textblob_analyzer
+
+def get_vectorized_vader():
+    """Return the process-wide VectorizedVader, compiled once from the VADER analyzer"""
+    global _vectorized_vader
+    if _vectorized_vader is None:
+        from vectorized_vader import VectorizedVader
+        _vectorized_vader = VectorizedVader(get_analyzers()[0])
+    return _vectorized_vader
+
+def textblob_sentiment(sentiment, text):
+    """(polarity, subjectivity) of text, exactly as TextBlob(text).sentiment gives them
+
+    sentiment is pattern's textblob.en.sentiment, called directly rather
+    than through PatternAnalyzer, which builds a namedtuple class per call.
+    Texts of lowercase words and whitespace only (what clean_text leaves of
+    most comments) are split on whitespace, as pattern's tokenizer would,
+    instead of going through it.
+    """
+    if text == text.lower() and "".join(text.split()).isalpha():
+        assessments = sentiment.assessments(((word, None) for word in text.split()), negation=True)
+        # Averaged like pattern's Sentiment.__call__, in the same order
+        count = float(len(assessments) or 1)
+        return (sum(polarity for _, polarity, _, _ in assessments) / count,
+                sum(subjectivity for _, _, subjectivity, _ in assessments) / count)
+    polarity, subjectivity = sentiment(text)
+    return polarity, subjectivity
+
+def categorize_sentiment(compound):
+    """Map a VADER compound score to a sentiment category"""
+    if compound >= 0.05:
+        return 'positive'
+    elif compound <= -0.05:
+        return 'negative'
+    return 'neutral'
+
 def analyze_sentiment(text):
     """Analyze sentiment using VADER and TextBlob"""
     # Handle NaN/None values
@@ -34,22 +152,13 @@ def analyze_sentiment(text):
     # Ensure text is a string
     text = str(text)
     
+    sid, pattern_analyzer = get_analyzers()
+    
     # VADER sentiment analysis
-    sid = SentimentIntensityAnalyzer()
     vader_scores = sid.polarity_scores(text)
     
     # TextBlob sentiment analysis
-    blob = TextBlob(text)
-    textblob_polarity = blob.sentiment.polarity
-    textblob_subjectivity = blob.sentiment.subjectivity
-    
-    # Determine sentiment category
-    if vader_scores['compound'] >= 0.05:
-        sentiment = 'positive'
-    elif vader_scores['compound'] <= -0.05:
-        sentiment = 'negative'
-    else:
-        sentiment = 'neutral'
+    textblob_polarity, textblob_subjectivity = pattern_analyzer.analyze(text)
     
     return {
         'vader_compound': vader_scores['compound'],
@@ -58,53 +167,367 @@ def analyze_sentiment(text):
         'vader_neutral': vader_scores['neu'],
         'textblob_polarity': textblob_polarity,
         'textblob_subjectivity': textblob_subjectivity,
-        'sentiment_category': sentiment
+        'sentiment_category': categorize_sentiment(vader_scores['compound'])
     }
 
-def process_tweets(input_file):
-    """Process tweets/Reddit comments and add sentiment analysis"""
-    # Read the CSV file
-    df = pd.read_csv(input_file)
+def allocate_scores(n_rows):
+    """Preallocated result arrays for n_rows texts: float32 scores and int8 category codes"""
+    scores = {col: np.empty(n_rows, dtype=np.float32) for col in SCORE_COLUMNS}
+    scores['sentiment_category'] = np.empty(n_rows, dtype=np.int8)
+    return scores
+
+def as_columns(scores):
+    """Turn result arrays into output columns, wrapping the category codes without a copy"""
+    columns = dict(scores)
+    columns['sentiment_category'] = pd.Categorical.from_codes(scores['sentiment_category'],
+                                                              dtype=SENTIMENT_CATEGORY_DTYPE)
+    return columns
+
+def _score_chunk(texts, backend='reference'):
+    """Score texts into result arrays, also returning the positions that fell back to neutral"""
+    if backend not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+    if backend != 'reference':
+        return _score_chunk_vectorized(texts, textblob=backend == 'vectorized')
+    scores = allocate_scores(len(texts))
+    failed = []
+    for position, text in enumerate(texts):
+        try:
+            row = analyze_sentiment(text)
+        except Exception as e:
+            print(f"Error analyzing sentiment for text: {str(text)[:50]}... Error: {e}")
+            # Use neutral sentiment as fallback
+            row = NEUTRAL_SENTIMENT
+            failed.append(position)
+        for col in SCORE_COLUMNS:
+            scores[col][position] = row[col]
+        scores['sentiment_category'][position] = CATEGORY_CODES[row['sentiment_category']]
+    return scores, failed
+
+def _score_chunk_vectorized(texts, textblob=True):
+    """_score_chunk with VADER scored for the whole chunk at once"""
+    texts = ["" if text is None or pd.isna(text) else str(text) for text in texts]
+    scores = allocate_scores(len(texts))
+    vader_scores = get_vectorized_vader().polarity_scores(texts)
+    scores['vader_compound'][:] = vader_scores['compound']
+    scores['vader_positive'][:] = vader_scores['pos']
+    scores['vader_negative'][:] = vader_scores['neg']
+    scores['vader_neutral'][:] = vader_scores['neu']
+    # Same thresholds as categorize_sentiment
+    compound = vader_scores['compound']
+    scores['sentiment_category'][:] = np.where(
+        compound >= 0.05, CATEGORY_CODES['positive'],
+        np.where(compound <= -0.05, CATEGORY_CODES['negative'], CATEGORY_CODES['neutral']))
     
-    # Determine the text column name (tweets use 'text', Reddit comments use 'body')
-    if 'text' in df.columns:
-        text_column = 'text'
-    elif 'body' in df.columns:
-        text_column = 'body'
+    failed = []
+    if not textblob:
+        scores['textblob_polarity'][:] = np.nan
+        scores['textblob_subjectivity'][:] = np.nan
+        return scores, failed
+    get_analyzers()
+    from textblob.en import sentiment
+    for position, text in enumerate(texts):
+        try:
+            polarity, subjectivity = textblob_sentiment(sentiment, text)
+        except Exception as e:
+            print(f"Error analyzing sentiment for text: {text[:50]}... Error: {e}")
+            # Use neutral sentiment as fallback
+            for col in SCORE_COLUMNS:
+                scores[col][position] = NEUTRAL_SENTIMENT[col]
+            scores['sentiment_category'][position] = CATEGORY_CODES[NEUTRAL_SENTIMENT['sentiment_category']]
+            failed.append(position)
+            continue
+        scores['textblob_polarity'][position] = polarity
+        scores['textblob_subjectivity'][position] = subjectivity
+    return scores, failed
+
+def score_batch(texts, backend='reference'):
+    """Score a batch of texts, returning a dict of column name -> float32 array (Categorical for the category)"""
+    return as_columns(_score_chunk(list(texts), backend)[0])
+
+def _init_scoring_worker(backend='reference'):
+    """Load the analyzers once when a pool worker starts"""
+    if backend == 'reference':
+        get_analyzers()
     else:
-        raise ValueError("No 'text' or 'body' column found in the CSV file")
+        get_vectorized_vader()
+
+def start_scoring_pool(workers, backend='reference'):
+    """Start a process pool whose workers have the analyzers for backend preloaded"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_scoring_worker, initargs=(backend,))
+
+def score_parallel(texts, workers, chunk_size=None, pool=None, return_failed=False, backend='reference'):
+    """Score texts across a pool of worker processes, keeping the input row order
+    
+    An already running pool (see start_scoring_pool) can be passed in to
+    reuse it across calls; otherwise one is started for this call. With
+    return_failed, the positions of rows that fell back to neutral scores
+    are returned alongside the columns. backend is one of SENTIMENT_BACKENDS.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) == 0:
+        scores, failed = _score_chunk(texts, backend)
+        columns = as_columns(scores)
+        return (columns, failed) if return_failed else columns
+    
+    # Split into a few chunks per worker so uneven chunks still balance out
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(texts) // (workers * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    
+    scores = allocate_scores(len(texts))
+    failed = []
+    own_pool = pool is None
+    if own_pool:
+        pool = start_scoring_pool(workers, backend)
+    try:
+        # map() yields results in submission order; each chunk's arrays are
+        # copied straight into their slice of the output
+        for offset, (chunk_scores, chunk_failed) in zip(range(0, len(texts), chunk_size),
+                                                        pool.map(partial(_score_chunk, backend=backend), chunks)):
+            for col in SENTIMENT_COLUMNS:
+                scores[col][offset:offset + len(chunk_scores[col])] = chunk_scores[col]
+            failed.extend(offset + position for position in chunk_failed)
+    finally:
+        if own_pool:
+            pool.shutdown()
+    columns = as_columns(scores)
+    return (columns, failed) if return_failed else columns
+
+# Scores depend on the analyzer versions, so they are part of every cache key
+ANALYZER_VERSION = f"nltk-{version('nltk')}/textblob-{version('textblob')}"
+
+class SentimentCache:
+    """Disk-backed LRU cache of sentiment scores, keyed by cleaned text
+    
+    Entries live in a local SQLite file and are evicted least recently used
+    first once the cache holds more than max_entries. Hit and miss counts
+    are kept for the lifetime of the object.
+    """
+    
+    # SQLite limits the number of bound parameters per statement
+    _LOOKUP_BATCH = 500
+    
+    def __init__(self, path, max_entries=1000000):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Parallel tasks share the file: wait for locks instead of failing, and
+        # let readers proceed while another task writes
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(
+            f"{col} TEXT" if col == 'sentiment_category' else f"{col} REAL"
+            for col in SENTIMENT_COLUMNS
+        )
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS sentiment_cache (key TEXT PRIMARY KEY, {columns}, last_used REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sentiment_cache_last_used ON sentiment_cache (last_used)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(text, backend='reference'):
+        """Hash the cleaned text together with the analyzer versions (and the backend, unless 'reference')"""
+        # Reference keys stay as they were, so existing caches remain valid
+        analyzer = ANALYZER_VERSION if backend == 'reference' else f"{ANALYZER_VERSION}/{backend}"
+        return hashlib.sha256(f"{analyzer}\0{text}".encode('utf-8')).hexdigest()
+    
+    def get_many(self, keys):
+        """Return a dict of key -> scores for the keys present in the cache"""
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), self._LOOKUP_BATCH):
+            batch = keys[i:i + self._LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, {', '.join(SENTIMENT_COLUMNS)} FROM sentiment_cache WHERE key IN ({placeholders})",
+                batch
+            )
+            for row in rows:
+                found[row[0]] = dict(zip(SENTIMENT_COLUMNS, row[1:]))
+        # Mark the hits as recently used
+        now = time.time()
+        self._conn.executemany("UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                               [(now, key) for key in found])
+        self._conn.commit()
+        return found
+    
+    def put_many(self, entries):
+        """Store a dict of key -> scores, evicting the oldest entries if over capacity"""
+        now = time.time()
+        placeholders = ", ".join("?" * (len(SENTIMENT_COLUMNS) + 2))
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO sentiment_cache (key, {', '.join(SENTIMENT_COLUMNS)}, last_used) VALUES ({placeholders})",
+            [(key, *(scores[col] for col in SENTIMENT_COLUMNS), now) for key, scores in entries.items()]
+        )
+        excess = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM sentiment_cache WHERE key IN (SELECT key FROM sentiment_cache ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+        self._conn.commit()
+    
+    def hit_rate(self):
+        """Fraction of rows served without scoring"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def close(self):
+        self._conn.close()
+
+def score_cached(texts, cache, workers=1, pool=None, backend='reference'):
+    """Score texts, looking each distinct text up in the cache before scoring it
+    
+    Every row whose text is already cached, or repeats an earlier row of the
+    batch, counts as a hit; each distinct text that has to be scored counts
+    as a miss. Each backend has its own cache entries.
+    """
+    texts = list(texts)
+    keys = [cache.make_key(text, backend) for text in texts]
+    
+    # Score each distinct uncached text once
+    unique = dict(zip(keys, texts))
+    position = {key: i for i, key in enumerate(unique)}
+    cached = cache.get_many(unique)
+    missing = [key for key in unique if key not in cached]
+    scored, failed = score_parallel([unique[key] for key in missing], workers, pool=pool,
+                                    return_failed=True, backend=backend)
+    
+    # One row per distinct text, filled from the cache and the fresh scores
+    scores = allocate_scores(len(unique))
+    hit_positions = [position[key] for key in cached]
+    miss_positions = [position[key] for key in missing]
+    for col in SCORE_COLUMNS:
+        scores[col][hit_positions] = [entry[col] for entry in cached.values()]
+        scores[col][miss_positions] = scored[col]
+    scores['sentiment_category'][hit_positions] = [
+        CATEGORY_CODES[entry['sentiment_category']] for entry in cached.values()
+    ]
+    scores['sentiment_category'][miss_positions] = scored['sentiment_category'].codes
+    
+    # Don't cache the fallback scores of texts that failed to analyze
+    failed = set(failed)
+    cache.put_many({
+        key: {col: scored[col][i].item() if col in SCORE_COLUMNS else scored[col][i] for col in SENTIMENT_COLUMNS}
+        for i, key in enumerate(missing) if i not in failed
+    })
+    
+    cache.misses += len(missing)
+    cache.hits += len(texts) - len(missing)
+    
+    # Fan the scores back out to every row
+    rows = np.fromiter((position[key] for key in keys), dtype=np.intp, count=len(keys))
+    return as_columns({col: scores[col][rows] for col in SENTIMENT_COLUMNS})
+
+def get_text_column(columns):
+    """Determine the text column name (tweets use 'text', Reddit comments use 'body')"""
+    if 'text' in columns:
+        return 'text'
+    elif 'body' in columns:
+        return 'body'
+    raise ValueError("No 'text' or 'body' column found in the CSV file")
+
+def process_frame(df, workers=1, pool=None, cache=None, near_duplicate_threshold=None, backend='reference'):
+    """Clean and score a DataFrame of tweets/Reddit comments
+    
+    backend selects how texts are scored (see SENTIMENT_BACKENDS). With a
+    near_duplicate_threshold, near-identical cleaned texts are
+    clustered first and only one representative per cluster is scored; its
+    scores are copied to the other members, and every row gets the id of its
+    cluster's representative in duplicate_cluster_id.
+    """
+    text_column = get_text_column(df.columns)
     
     # Fill NaN values in text column
     df[text_column] = df[text_column].fillna("")
     
     # Clean the text
-    df['cleaned_text'] = df[text_column].apply(clean_text)
+    df['cleaned_text'] = clean_text_series(df[text_column])
     
-    # Analyze sentiment with error handling
-    sentiment_results = []
-    for text in df['cleaned_text']:
-        try:
-            sentiment_result = analyze_sentiment(text)
-            sentiment_results.append(sentiment_result)
-        except Exception as e:
-            print(f"Error analyzing sentiment for text: {text[:50]}... Error: {e}")
-            # Use neutral sentiment as fallback
-            sentiment_results.append({
-                'vader_compound': 0.0,
-                'vader_positive': 0.0,
-                'vader_negative': 0.0,
-                'vader_neutral': 1.0,
-                'textblob_polarity': 0.0,
-                'textblob_subjectivity': 0.0,
-                'sentiment_category': 'neutral'
-            })
-    
-    sentiment_df = pd.DataFrame(sentiment_results)
-    
-    # Combine with original data
-    result_df = pd.concat([df, sentiment_df], axis=1)
-    
-    return result_df
+    texts = df['cleaned_text']
+    fan_out = None
+    if near_duplicate_threshold is not None:
+        representative = find_near_duplicates(texts, near_duplicate_threshold)
+        scored_rows, fan_out = np.unique(representative, return_inverse=True)
+        texts = texts.iloc[scored_rows]
+        ids = df['id'] if 'id' in df.columns else df.index.to_series()
+        df['duplicate_cluster_id'] = ids.astype(str).to_numpy()[representative]
+        record(near_duplicate_rows=len(df) - len(scored_rows))
+    
+    # Analyze sentiment for the whole column, in parallel and/or cached if requested
+    if cache is not None:
+        scores = score_cached(texts, cache, workers, pool=pool, backend=backend)
+    else:
+        scores = score_parallel(texts, workers, pool=pool, backend=backend)
+    if fan_out is not None:
+        scores = {col: values[fan_out] for col, values in scores.items()}
+    
+    # Attach the result arrays as new columns; unlike a concat this copies nothing
+    for col in SENTIMENT_COLUMNS:
+        df[col] = scores[col]
+    return df
+
+def open_cache(cache_path):
+    """Open the sentiment cache at cache_path, or return None if caching is off"""
+    return SentimentCache(cache_path) if cache_path else None
+
+def report_cache(cache):
+    """Print the cache hit rate and close the cache"""
+    if cache is not None:
+        print(f"Sentiment cache: {cache.hits} hits, {cache.misses} misses "
+              f"({cache.hit_rate():.1%} hit rate)")
+        record(cache_hits=cache.hits, cache_misses=cache.misses)
+        cache.close()
+
+def process_tweets(input_file, workers=1, cache_path=None, near_duplicate_threshold=None, backend='reference'):
+    """Process tweets/Reddit comments and add sentiment analysis
+    
+    With workers > 1 the scoring is spread over that many processes. With a
+    cache_path, scores are memoized in a SQLite cache at that path. With a
+    near_duplicate_threshold, near-duplicates share one score (see process_frame).
+    backend is one of SENTIMENT_BACKENDS.
+    """
+    # Read the Parquet or CSV file
+    df = read_frame(input_file)
+    record(rows_in=len(df), bytes_read=file_size(input_file))
+    cache = open_cache(cache_path)
+    try:
+        return process_frame(df, workers, cache=cache, near_duplicate_threshold=near_duplicate_threshold,
+                             backend=backend)
+    finally:
+        report_cache(cache)
+
+def process_tweets_streaming(input_file, output_file, chunk_size=50000, workers=1, cache_path=None,
+                             near_duplicate_threshold=None, backend='reference'):
+    """Process a raw file chunk by chunk, appending each scored chunk to output_file
+    
+    Only one chunk is held in memory at a time, so inputs larger than memory
+    can be processed. Inputs holding tweets (a 'text' column) are taken as
+    raw tweets, others as raw comments: Parquet inputs are read with only
+    those raw columns, and Parquet outputs use the matching processed
+    schema. Near-duplicates are detected within each chunk. Returns the
+    number of rows written.
+    """
+    raw_schema, processed_schema = raw_schemas(input_file)
+    columns = raw_schema.names if is_parquet(input_file) else None
+    pool = start_scoring_pool(workers, backend) if workers > 1 else None
+    cache = open_cache(cache_path)
+    try:
+        with FrameWriter(output_file, processed_schema) as writer:
+            for chunk in iter_frames(input_file, chunk_size, columns=columns):
+                writer.write(process_frame(chunk, workers, pool=pool, cache=cache,
+                                           near_duplicate_threshold=near_duplicate_threshold,
+                                           backend=backend))
+                print(f"Processed {writer.rows} rows from {input_file}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        report_cache(cache)
+    record(rows_in=writer.rows, rows_out=writer.rows,
+           bytes_read=file_size(input_file), bytes_written=file_size(output_file))
+    return writer.rows
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,246 @@
+# scripts/sentiment_rollups.py
+from datetime import timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from database import TABLES, get_engine, table_key
+
+# Pre-aggregated sentiment per source (subreddit or search query), time
+# bucket and sentiment category, at each grain from finest to coarsest. Each
+# rollup of a table lives in {table_name}_{suffix}.
+ROLLUP_GRAINS = {'hour': 'hourly', 'day': 'daily'}
+GRAIN_LENGTHS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+# Per table: the column rows are grouped by and the expression of their time in UTC
+ROLLUPS = {
+    'processed_reddit_comments': {
+        'dimension': 'subreddit',
+        'time': "to_timestamp(created_utc) AT TIME ZONE 'UTC'",
+    },
+    'processed_tweets': {
+        'dimension': 'search_query',
+        'time': 'created_at',
+    },
+}
+
+# Counted (non-null values) and summed per bucket, so averages over any set
+# of buckets are sum / count. The fast sentiment backend leaves the TextBlob
+# scores NULL, so their counts can be lower than row_count.
+ROLLUP_MEASURES = [
+    'vader_compound', 'vader_positive', 'vader_negative', 'vader_neutral',
+    'textblob_polarity', 'textblob_subjectivity'
+]
+
+def rollup_table(table_name, grain):
+    """Name of the rollup of table_name at grain"""
+    return f"{table_name}_{ROLLUP_GRAINS[grain]}"
+
+def _exists(conn, schema, table_name):
+    return conn.execute(text("SELECT to_regclass(:name)"), {'name': f"{schema}.{table_name}"}).scalar() is not None
+
+def create_rollup_tables(conn, table, schema, table_name=None):
+    """Create the rollup tables of one of the ROLLUPS tables unless they exist
+
+    Rollups created for a table that already holds rows are filled from
+    those rows once, so the incremental updates start from a complete
+    state; so are rollups created before the per-measure counts existed.
+    Returns the grains whose rollup was (re)filled.
+    """
+    table_name = table_name or table
+    dimension = ROLLUPS[table]['dimension']
+    counters = ",\n    ".join(f"{col} {'BIGINT' if col.startswith('count_') else 'DOUBLE PRECISION'} NOT NULL"
+                               for col in _counters()[1:])
+    created = []
+    for grain in ROLLUP_GRAINS:
+        rollup = rollup_table(table_name, grain)
+        if _exists(conn, schema, rollup):
+            counts = [f"count_{measure}" for measure in ROLLUP_MEASURES]
+            present = set(conn.execute(text(
+                "SELECT column_name FROM information_schema.columns WHERE table_schema = :schema AND table_name = :name"
+            ), {'schema': schema, 'name': rollup}).scalars())
+            missing = [col for col in counts if col not in present]
+            for col in missing:
+                conn.execute(text(f"ALTER TABLE {schema}.{rollup} ADD COLUMN {col} BIGINT NOT NULL DEFAULT 0"))
+            if missing:
+                created.append(grain)
+            continue
+        conn.execute(text(f"""
+        CREATE TABLE {schema}.{rollup} (
+            {dimension} TEXT NOT NULL,
+            bucket_start TIMESTAMP NOT NULL,
+            sentiment_category TEXT NOT NULL,
+            row_count BIGINT NOT NULL,
+            {counters},
+            PRIMARY KEY ({dimension}, bucket_start, sentiment_category)
+        )
+        """))
+        # Dashboards filter on time across all sources
+        conn.execute(text(f"CREATE INDEX {rollup}_bucket_start_idx ON {schema}.{rollup} (bucket_start)"))
+        created.append(grain)
+    if created and _exists(conn, schema, table_name):
+        rebuild_rollups(conn, table, schema, table_name, grains=created)
+    return created
+
+def _aggregate(table, schema, table_name, grain, where="TRUE", sign=1):
+    """SELECT of sign times the rollup rows of table_name's rows matching where"""
+    spec = ROLLUPS[table]
+    measures = ", ".join(f"{sign} * COUNT({measure}), {sign} * COALESCE(SUM({measure}), 0)"
+                         for measure in ROLLUP_MEASURES)
+    return f"""
+    SELECT COALESCE({spec['dimension']}, ''), date_trunc('{grain}', {spec['time']}),
+           COALESCE(sentiment_category, ''), {sign} * COUNT(*), {measures}
+    FROM {schema}.{table_name}
+    WHERE {spec['time']} IS NOT NULL AND ({where})
+    GROUP BY 1, 2, 3
+    """
+
+def _counters():
+    """The additive columns of a rollup row, in table order"""
+    columns = ['row_count']
+    for measure in ROLLUP_MEASURES:
+        columns += [f"count_{measure}", f"sum_{measure}"]
+    return columns
+
+def _rollup_columns(table):
+    return ", ".join([ROLLUPS[table]['dimension'], 'bucket_start', 'sentiment_category'] + _counters())
+
+def lock_rollups(conn, schema, table_name):
+    """Hold table_name's rollup lock until the end of the transaction
+
+    The -1 / write / +1 sequence of apply_rollups is only exact if no
+    other transaction writes the same rows in between, so concurrent
+    writers of one table take turns from their -1 step to their commit.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+                 {'name': f"rollups:{schema}.{table_name}"})
+
+def apply_rollups(conn, table, schema, table_name, keys_table, sign):
+    """Add (sign=1) or subtract (sign=-1) the rows of table_name whose key is in keys_table
+
+    Loaders call this with sign=-1 before writing a batch and sign=1 after
+    it, with keys_table holding the batch's keys, in one transaction. The
+    rows the batch replaces are taken out and the rows as written are
+    added, so rewriting a row never counts it twice. The -1 step takes the
+    table's rollup lock (see lock_rollups).
+    """
+    if sign < 0:
+        lock_rollups(conn, schema, table_name)
+    key = table_key(table)
+    key_list = ", ".join(key)
+    # Bounding the partition column lets the lookup skip the other partitions
+    time_column = TABLES[table]['partition_by']
+    start, end = conn.execute(text(f"SELECT MIN({time_column}), MAX({time_column}) FROM {keys_table}")).one()
+    if start is None:
+        return
+    where = (f"{time_column} BETWEEN :start AND :end "
+             f"AND ({key_list}) IN (SELECT {key_list} FROM {keys_table})")
+    # The rows are read once, into hourly buckets that every grain then sums up
+    dimension = ROLLUPS[table]['dimension']
+    counters = _counters()
+    conn.execute(text("DROP TABLE IF EXISTS pg_temp.rollup_delta"))
+    conn.execute(text(f"CREATE TEMP TABLE rollup_delta ({_rollup_columns(table)}) ON COMMIT DROP AS "
+                      f"{_aggregate(table, schema, table_name, 'hour', where, sign)}"), {'start': start, 'end': end})
+    for grain in ROLLUP_GRAINS:
+        rollup = rollup_table(table_name, grain)
+        updates = ", ".join(f"{col} = {rollup}.{col} + EXCLUDED.{col}" for col in counters)
+        conn.execute(text(f"""
+        INSERT INTO {schema}.{rollup} ({_rollup_columns(table)})
+        SELECT {dimension}, date_trunc('{grain}', bucket_start), sentiment_category,
+               {', '.join(f'SUM({col})' for col in counters)}
+        FROM pg_temp.rollup_delta
+        GROUP BY 1, 2, 3
+        ON CONFLICT ({dimension}, bucket_start, sentiment_category)
+        DO UPDATE SET {updates}
+        """))
+
+def rebuild_rollups(conn, table, schema, table_name=None, grains=None):
+    """Recompute the rollups of table_name from all of its rows, e.g. after a full reload"""
+    table_name = table_name or table
+    lock_rollups(conn, schema, table_name)
+    for grain in grains or ROLLUP_GRAINS:
+        rollup = rollup_table(table_name, grain)
+        conn.execute(text(f"TRUNCATE {schema}.{rollup}"))
+        conn.execute(text(f"INSERT INTO {schema}.{rollup} ({_rollup_columns(table)}) "
+                          f"{_aggregate(table, schema, table_name, grain)}"))
+
+def _utc(value):
+    """value as a naive UTC Timestamp, like the bucket_start column"""
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_convert('UTC').tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+def _ceil(timestamp, grain):
+    floor = timestamp.floor('h' if grain == 'hour' else 'D')
+    return floor if floor == timestamp else floor + GRAIN_LENGTHS[grain]
+
+def plan_rollup_query(start, end):
+    """Split [start, end) into (grain, start, end) ranges, as many as possible at the coarsest grain
+
+    Naive times are taken as UTC. Only whole hours can be answered, so the range covers
+    the hours starting in [start, end). Whole days go to the daily rollup,
+    the hours at either edge to the hourly one.
+    """
+    start, end = _ceil(_utc(start), 'hour'), _ceil(_utc(end), 'hour')
+    if start >= end:
+        return []
+    first_day, last_day = _ceil(start, 'day'), end.floor('D')
+    if first_day >= last_day:
+        return [('hour', start, end)]
+    plan = [('hour', start, first_day), ('day', first_day, last_day), ('hour', last_day, end)]
+    return [(grain, lo, hi) for grain, lo, hi in plan if lo < hi]
+
+def query_sentiment(start, end, table='processed_reddit_comments', by=('sentiment_category',), sources=None,
+                    grain=None, schema='raw_data', table_name=None, conn=None):
+    """Row counts and average scores over [start, end) from the rollups instead of the rows
+
+    by groups the result by the source column (e.g. 'subreddit') and/or
+    'sentiment_category'; sources limits it to some subreddits/search
+    queries. Without a grain the range is answered from the coarsest
+    rollups that fit it (see plan_rollup_query); with grain='hour' or
+    'day', the result has one row per bucket of that grain, in a
+    bucket_start column. Returns a DataFrame with row_count and
+    avg_<measure> columns.
+    """
+    if conn is None:
+        with get_engine().connect() as conn:
+            return query_sentiment(start, end, table, by, sources, grain, schema, table_name, conn)
+    table_name = table_name or table
+    dimension = ROLLUPS[table]['dimension']
+    by = list(by)
+    unknown = set(by) - {dimension, 'sentiment_category'}
+    if unknown:
+        raise ValueError(f"Cannot group {table} rollups by {sorted(unknown)}")
+    if grain is not None:
+        start, end = _ceil(_utc(start), grain), _ceil(_utc(end), grain)
+        plan = [(grain, start, end)] if start < end else []
+        by = ['bucket_start'] + by
+    else:
+        plan = plan_rollup_query(start, end)
+
+    params = {}
+    parts = []
+    for i, (part_grain, lo, hi) in enumerate(plan):
+        where = f"bucket_start >= :start_{i} AND bucket_start < :end_{i}"
+        params.update({f"start_{i}": lo.to_pydatetime(), f"end_{i}": hi.to_pydatetime()})
+        if sources is not None:
+            where += f" AND {dimension} = ANY(:sources)"
+            params['sources'] = list(sources)
+        parts.append(f"SELECT * FROM {schema}.{rollup_table(table_name, part_grain)} WHERE {where}")
+    columns = by + ['row_count'] + [f"avg_{measure}" for measure in ROLLUP_MEASURES]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    # Over the rows that have the score, not all rows
+    averages = ", ".join(f"SUM(sum_{measure}) / NULLIF(SUM(count_{measure}), 0) AS avg_{measure}"
+                         for measure in ROLLUP_MEASURES)
+    group = f"GROUP BY {', '.join(by)}" if by else ""
+    order = f"ORDER BY {', '.join(by)}" if by else ""
+    # Groups whose rows were all rewritten into other groups keep a zero count
+    sql = f"""
+    SELECT {''.join(f'{col}, ' for col in by)}SUM(row_count)::bigint AS row_count, {averages}
+    FROM ({' UNION ALL '.join(parts)}) buckets
+    {group}
+    HAVING SUM(row_count) > 0
+    {order}
+    """
+    return pd.DataFrame(conn.execute(text(sql), params).fetchall(), columns=columns)
@@ -0,0 +1,228 @@
+# scripts/synthetic_data.py
+import argparse
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from file_io import RAW_COMMENT_SCHEMA, RAW_TWEET_SCHEMA, is_parquet
+
+# Opening phrases per sentiment, in (positive, negative, neutral) order
+SENTIMENT_PHRASES = (
+    ["I love how", "Great progress on", "Exciting developments in",
+     "Impressive advances with", "Optimistic about", "So happy to see"],
+    ["Concerned about", "Disappointed with", "Worried that",
+     "Frustrated by", "Skeptical of", "Really angry about"],
+    ["Reading about", "Some thoughts on", "Here is an update on",
+     "Looking into", "A question about", "Just saw this on"],
+)
+
+# Neutral words used to pad texts out to the sampled length
+FILLER_WORDS = [
+    "the", "policy", "today", "city", "report", "people", "said", "new", "year", "market",
+    "local", "council", "plan", "week", "government", "data", "team", "state", "time", "article",
+    "country", "vote", "school", "company", "budget", "meeting", "public", "street", "system", "story",
+]
+
+DEFAULT_TOPICS = ["the news", "the economy", "the election", "climate change", "renewable energy",
+                  "sustainability", "public transport", "housing"]
+DEFAULT_SUBREDDITS = ["news", "worldnews", "politics", "technology", "science"]
+
+HASHTAG_OPTIONS = {
+    "climate change": ["ClimateAction", "GlobalWarming", "ClimateEmergency", "SaveEarth"],
+    "renewable energy": ["CleanEnergy", "SolarPower", "WindEnergy", "Sustainability"],
+    "sustainability": ["EcoFriendly", "GreenLiving", "ZeroWaste", "SustainableFuture"],
+}
+DEFAULT_HASHTAGS = ["Future", "Innovation", "Technology", "Progress"]
+
+LOCATIONS = ["New York", "London", "Tokyo", "Berlin", "Sydney", "", "Remote"]
+
+# Fixed default time window, so the same seed always gives the same rows
+DEFAULT_END_UTC = 1750000000
+DEFAULT_SPAN_SECONDS = 30 * 24 * 3600
+
+# Distinct filler strings prebuilt per word count
+FILLER_VARIANTS = 64
+
+def _filler_bank(rng, max_words):
+    """Prebuilt filler strings; entry words * FILLER_VARIANTS + k has `words` words"""
+    bank = []
+    for words in range(max_words + 1):
+        for _ in range(FILLER_VARIANTS):
+            bank.append(" ".join(rng.choice(FILLER_WORDS, size=words)))
+    return pa.array(bank)
+
+def _sample_lengths(rng, n_rows, min_words, max_words, length_distribution, mean_words):
+    """Number of filler words per row"""
+    if length_distribution == 'uniform':
+        return rng.integers(min_words, max_words + 1, n_rows)
+    if length_distribution == 'lognormal':
+        # Long-tailed like real comments, with the given mean
+        sigma = 0.8
+        mu = np.log(max(mean_words, 1)) - sigma ** 2 / 2
+        lengths = np.rint(rng.lognormal(mu, sigma, n_rows)).astype(np.int64)
+        return np.clip(lengths, min_words, max_words)
+    raise ValueError(f"Unknown length distribution: {length_distribution}")
+
+def _make_texts(rng, n_rows, topics, fillers, sentiment_mix, duplicate_rate,
+                min_words, max_words, length_distribution, mean_words):
+    """Vectorized '<phrase> <topic>. <filler>' texts; returns (texts, topic indices)"""
+    phrase_pool = pa.array([phrase for phrases in SENTIMENT_PHRASES for phrase in phrases])
+    per_sentiment = len(SENTIMENT_PHRASES[0])
+    mix = np.asarray(sentiment_mix, dtype=float)
+    sentiments = rng.choice(len(SENTIMENT_PHRASES), size=n_rows, p=mix / mix.sum())
+    phrase_idx = sentiments * per_sentiment + rng.integers(0, per_sentiment, n_rows)
+
+    topic_idx = rng.integers(0, len(topics), n_rows)
+    topic_pool = pa.array([f"{topic}." for topic in topics])
+
+    lengths = _sample_lengths(rng, n_rows, min_words, max_words, length_distribution, mean_words)
+    filler_idx = lengths * FILLER_VARIANTS + rng.integers(0, FILLER_VARIANTS, n_rows)
+
+    texts = pc.binary_join_element_wise(
+        phrase_pool.take(phrase_idx), topic_pool.take(topic_idx), fillers.take(filler_idx), " ")
+    texts = pc.utf8_rtrim_whitespace(texts)
+
+    # Duplicates copy the text of a random row of the same chunk
+    if duplicate_rate > 0:
+        source = np.arange(n_rows)
+        duplicates = rng.random(n_rows) < duplicate_rate
+        source[duplicates] = rng.integers(0, n_rows, int(duplicates.sum()))
+        texts = texts.take(source)
+        topic_idx = topic_idx[source]
+    return texts, topic_idx
+
+def _make_ids(prefix, start, n_rows):
+    numbers = pa.array(np.arange(start, start + n_rows)).cast(pa.string())
+    return pc.binary_join_element_wise(prefix, numbers, "")
+
+def _make_times(rng, n_rows, end_utc, span_seconds):
+    return rng.integers(end_utc - span_seconds, end_utc + 1, n_rows)
+
+def generate_reddit_chunk(n_rows, seed=0, chunk_index=0, start_row=0, subreddits=DEFAULT_SUBREDDITS,
+                          topics=DEFAULT_TOPICS, duplicate_rate=0.0, sentiment_mix=(0.4, 0.4, 0.2),
+                          min_words=0, max_words=40, length_distribution='lognormal', mean_words=12,
+                          end_utc=DEFAULT_END_UTC, span_seconds=DEFAULT_SPAN_SECONDS):
+    """One chunk of synthetic Reddit comments as an Arrow table with the raw comment schema"""
+    rng = np.random.default_rng([seed, chunk_index])
+    fillers = _filler_bank(np.random.default_rng(seed), max_words)
+    texts, _ = _make_texts(rng, n_rows, topics, fillers, sentiment_mix, duplicate_rate,
+                           min_words, max_words, length_distribution, mean_words)
+    return pa.Table.from_arrays([
+        _make_ids(f"syn{seed}x", start_row, n_rows),
+        texts,
+        pa.array(_make_times(rng, n_rows, end_utc, span_seconds), pa.int64()),
+        pa.array(np.rint(rng.pareto(1.5, n_rows) * 3).astype(np.int64) - rng.integers(0, 3, n_rows)),
+        pa.array(subreddits).take(rng.integers(0, len(subreddits), n_rows)),
+    ], schema=RAW_COMMENT_SCHEMA)
+
+def generate_tweet_chunk(n_rows, seed=0, chunk_index=0, start_row=0, search_terms=None,
+                         duplicate_rate=0.0, sentiment_mix=(0.5, 0.5, 0.0),
+                         min_words=0, max_words=20, length_distribution='uniform', mean_words=6,
+                         end_utc=DEFAULT_END_UTC, span_seconds=DEFAULT_SPAN_SECONDS):
+    """One chunk of synthetic tweets as an Arrow table with the raw tweet schema"""
+    search_terms = search_terms or DEFAULT_TOPICS
+    rng = np.random.default_rng([seed, chunk_index])
+    fillers = _filler_bank(np.random.default_rng(seed), max_words)
+    texts, term_idx = _make_texts(rng, n_rows, search_terms, fillers, sentiment_mix, duplicate_rate,
+                                  min_words, max_words, length_distribution, mean_words)
+
+    # Up to three hashtags per tweet, drawn from its search term's options
+    hashtag_pools = [
+        next((tags for key, tags in HASHTAG_OPTIONS.items() if key in term.lower()), DEFAULT_HASHTAGS)
+        for term in search_terms
+    ]
+    flat_pool = pa.array([tag for tags in hashtag_pools for tag in tags])
+    pool_start = np.cumsum([0] + [len(tags) for tags in hashtag_pools])[:-1]
+    pool_size = np.array([len(tags) for tags in hashtag_pools])
+    counts = np.minimum(rng.integers(0, 4, n_rows), pool_size[term_idx])
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    row_of_tag = np.repeat(np.arange(n_rows), counts)
+    # Consecutive pool entries from a random starting point, so a tweet never repeats a tag
+    position = np.arange(len(row_of_tag)) - offsets[row_of_tag]
+    first = rng.integers(0, 1 << 30, n_rows)
+    term_of_tag = term_idx[row_of_tag]
+    tag_idx = pool_start[term_of_tag] + (first[row_of_tag] + position) % pool_size[term_of_tag]
+    hashtags = pa.ListArray.from_arrays(pa.array(offsets), flat_pool.take(tag_idx))
+
+    # Casting second-resolution timestamps renders 'YYYY-MM-DD HH:MM:SS', far faster than strftime
+    created = pa.array(_make_times(rng, n_rows, end_utc, span_seconds), pa.timestamp('s'))
+    return pa.Table.from_arrays([
+        _make_ids(f"mock_{seed}_", start_row, n_rows),
+        created.cast(pa.string()),
+        texts,
+        _make_ids("user_", 1000, 9000).take(rng.integers(0, 9000, n_rows)),
+        pa.array(LOCATIONS).take(rng.integers(0, len(LOCATIONS), n_rows)),
+        pa.array(rng.integers(0, 501, n_rows)),
+        pa.array(rng.integers(0, 1001, n_rows)),
+        hashtags,
+        pa.array(search_terms).take(term_idx),
+    ], schema=RAW_TWEET_SCHEMA)
+
+GENERATORS = {
+    'reddit': (generate_reddit_chunk, RAW_COMMENT_SCHEMA),
+    'tweets': (generate_tweet_chunk, RAW_TWEET_SCHEMA),
+}
+
+def iter_synthetic_chunks(kind, n_rows, chunk_size=1000000, seed=0, **options):
+    """Yield Arrow tables of at most chunk_size synthetic rows
+
+    The same seed, chunk_size and options always give the same rows.
+    """
+    generate, _ = GENERATORS[kind]
+    for chunk_index, start_row in enumerate(range(0, n_rows, chunk_size)):
+        yield generate(min(chunk_size, n_rows - start_row), seed=seed, chunk_index=chunk_index,
+                       start_row=start_row, **options)
+
+def write_synthetic(kind, n_rows, path, chunk_size=1000000, seed=0, **options):
+    """Stream synthetic rows to a Parquet (or .csv) file one chunk at a time; returns rows written"""
+    _, schema = GENERATORS[kind]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if is_parquet(path):
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        # CSV cannot hold lists, so hashtags are written comma-separated
+        csv_schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_list(f.type) else f for f in schema])
+        writer = pa_csv.CSVWriter(path, csv_schema)
+    written = 0
+    try:
+        for table in iter_synthetic_chunks(kind, n_rows, chunk_size, seed, **options):
+            if not is_parquet(path) and 'hashtags' in table.column_names:
+                table = table.set_column(table.schema.get_field_index('hashtags'), 'hashtags',
+                                         pc.binary_join(table['hashtags'], ','))
+            writer.write_table(table)
+            written += table.num_rows
+    finally:
+        writer.close()
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic tweets or Reddit comments")
+    parser.add_argument('kind', choices=sorted(GENERATORS))
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--output', required=True, help="Output path (.parquet, or .csv)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0,
+                        help="Fraction of rows that repeat the text of another row")
+    parser.add_argument('--sentiment-mix', type=float, nargs=3, metavar=('POS', 'NEG', 'NEU'),
+                        help="Relative share of positive, negative and neutral texts")
+    parser.add_argument('--min-words', type=int, help="Minimum filler words per text")
+    parser.add_argument('--max-words', type=int, help="Maximum filler words per text")
+    parser.add_argument('--length-distribution', choices=['uniform', 'lognormal'])
+    parser.add_argument('--mean-words', type=float, help="Mean filler words for the lognormal distribution")
+    args = parser.parse_args()
+
+    options = {'duplicate_rate': args.duplicate_rate}
+    for name in ('sentiment_mix', 'min_words', 'max_words', 'length_distribution', 'mean_words'):
+        if getattr(args, name) is not None:
+            options[name] = getattr(args, name)
+
+    start = time.perf_counter()
+    rows = write_synthetic(args.kind, args.rows, args.output, args.chunk_size, args.seed, **options)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows} {args.kind} rows to {args.output} in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
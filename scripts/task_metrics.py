@@ -0,0 +1,153 @@
+# scripts/task_metrics.py
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+METRICS_PATH = os.getenv('TASK_METRICS_PATH', 'data/metrics/task_metrics.jsonl')
+PROFILE_DIR = os.getenv('TASK_PROFILE_DIR', 'data/metrics/profiles')
+PROFILE_INTERVAL = float(os.getenv('TASK_PROFILE_INTERVAL', '0.005'))
+
+# Metrics of the task currently running in this process, if any
+_current = None
+
+def record(**values):
+    """Add counters (rows_in, rows_out, bytes_read, bytes_written, cache_hits, ...) to the running task
+
+    Values are summed over repeated calls, so chunked stages can report per
+    chunk. Does nothing outside an instrumented task.
+    """
+    if _current is None:
+        return
+    for name, value in values.items():
+        _current[name] = _current.get(name, 0) + value
+
+def file_size(path):
+    """Size of path in bytes, or 0 if it does not exist"""
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def profiling_enabled(task_id):
+    """TASK_PROFILE=1 profiles every task; a comma-separated list profiles only those task ids"""
+    setting = os.getenv('TASK_PROFILE', '').strip()
+    if setting.lower() in ('', '0', 'false', 'no'):
+        return False
+    if setting.lower() in ('1', 'true', 'yes', 'all'):
+        return True
+    return task_id in [name.strip() for name in setting.split(',')]
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a background thread
+
+    Stacks are counted in the collapsed "outer;...;inner count" format that
+    flamegraph.pl, speedscope and inferno read directly. Only the profiled
+    thread is sampled, not worker processes it starts.
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        """Write the collapsed stacks to path"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+def write_metrics(metrics, path=METRICS_PATH):
+    """Append one task's metrics to the local JSON-lines metrics file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(metrics) + "\n")
+
+def instrumented(func):
+    """Wrap an Airflow task callable to collect its metrics
+
+    Records wall and CPU time, peak memory of the task process and of its
+    worker processes, and whatever counters the task reports through
+    record(). The metrics are pushed to XCom under the key 'metrics' and
+    appended to TASK_METRICS_PATH; with TASK_PROFILE set, a sampling profile
+    of the task is written to TASK_PROFILE_DIR as well.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _current
+        ti = kwargs.get('ti')
+        task_id = ti.task_id if ti is not None else func.__name__
+        metrics = {
+            'dag_id': ti.dag_id if ti is not None else None,
+            'task_id': task_id,
+            'run_id': ti.run_id if ti is not None else None,
+            # Index of the instance of a mapped task, -1 for unmapped tasks
+            'map_index': getattr(ti, 'map_index', -1) if ti is not None else None,
+            'try_number': ti.try_number if ti is not None else None,
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        profiler = SamplingProfiler().start() if profiling_enabled(task_id) else None
+        outer, _current = _current, {}
+        start, cpu_start = time.perf_counter(), time.process_time()
+        status = 'failed'
+        try:
+            result = func(*args, **kwargs)
+            status = 'success'
+            return result
+        finally:
+            counters, _current = _current, outer
+            metrics.update(counters)
+            metrics.update({
+                'status': status,
+                'wall_seconds': round(time.perf_counter() - start, 3),
+                'cpu_seconds': round(time.process_time() - cpu_start, 3),
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'peak_child_rss_mb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            })
+            if metrics['wall_seconds'] > 0 and 'rows_out' in metrics:
+                metrics['rows_per_sec'] = round(metrics['rows_out'] / metrics['wall_seconds'], 1)
+            lookups = metrics.get('cache_hits', 0) + metrics.get('cache_misses', 0)
+            if lookups:
+                metrics['cache_hit_rate'] = round(metrics['cache_hits'] / lookups, 4)
+            if profiler is not None:
+                profiler.stop()
+                run_id = (metrics['run_id'] or 'manual').replace(':', '_').replace('+', '_')
+                if metrics['map_index'] is not None and metrics['map_index'] >= 0:
+                    run_id = f"{run_id}_{metrics['map_index']}"
+                metrics['profile'] = profiler.write(os.path.join(PROFILE_DIR, f"{task_id}_{run_id}.folded"))
+
+            write_metrics(metrics)
+            print(f"Task metrics: {json.dumps(metrics)}")
+            if ti is not None and status == 'success':
+                ti.xcom_push(key='metrics', value=metrics)
+    return wrapper
@@ -0,0 +1,250 @@
+# scripts/vectorized_vader.py
+import string
+
+import numpy as np
+import pandas as pd
+
+# Allowed difference from nltk's polarity_scores, one unit in the last
+# place of each rounded score (benchmarks/sentiment_backends.py checks it).
+# The rules are the same and the sums are taken in the same order, so the
+# scores normally match exactly; this leaves room for a sum of many tokens
+# accumulating differently and landing on the other side of a rounding
+# boundary.
+TOLERANCE = {
+    'vader_compound': 1e-4,
+    'vader_positive': 1e-3,
+    'vader_negative': 1e-3,
+    'vader_neutral': 1e-3,
+}
+
+class VectorizedVader:
+    """VADER's polarity_scores over a whole batch of texts with NumPy
+
+    The lexicon, boosters and negations of a reference nltk
+    SentimentIntensityAnalyzer are compiled into arrays indexed by word id.
+    A batch is split into tokens once, each distinct token is looked up
+    once, and VADER's rules (capitalisation, boosters, negations, "never
+    so", idioms, "least", "but" and punctuation emphasis) are applied to
+    all tokens at once by comparing each token with its neighbours.
+    """
+
+    def __init__(self, analyzer):
+        constants = analyzer.constants
+        self.constants = constants
+        # Single-word boosters only; the multi-word ones ("kind of") are
+        # handled with the idioms
+        boosters = {word: value for word, value in constants.BOOSTER_DICT.items() if ' ' not in word}
+        self.multiword_boosters = [word.split() for word in constants.BOOSTER_DICT if ' ' in word]
+        self.idioms = [(phrase.split(), value) for phrase, value in constants.SPECIAL_CASE_IDIOMS.items()]
+        self.punctuation = sorted(constants.PUNC_LIST, key=len, reverse=True)
+
+        words = pd.Index(sorted(set(analyzer.lexicon) | set(boosters) | constants.NEGATE))
+        self.words = words
+        self.valence = np.full(len(words), np.nan)
+        self.valence[words.get_indexer(list(analyzer.lexicon))] = list(analyzer.lexicon.values())
+        self.booster = np.zeros(len(words))
+        self.booster[words.get_indexer(list(boosters))] = list(boosters.values())
+        self.negation = np.zeros(len(words), dtype=bool)
+        self.negation[words.get_indexer(list(constants.NEGATE))] = True
+
+    def _strip_punctuation(self, token):
+        """The word a token stands for once one leading or trailing punctuation mark is removed
+
+        Mirrors SentiText: "cat," becomes "cat", while contractions and
+        emoticons keep their punctuation.
+        """
+        for mark in self.punctuation:
+            for word in (token[len(mark):] if token.startswith(mark) else None,
+                         token[:-len(mark)] if token.endswith(mark) else None):
+                if word is not None and len(word) > 1 and not any(c in string.punctuation for c in word):
+                    return word
+        return token
+
+    def tokenize(self, texts):
+        """Split texts into VADER tokens, returned as batch-local ids
+
+        Returns the id of every token, the text (row) each token belongs to,
+        and the distinct token strings the ids refer to.
+        """
+        tokens = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, tokens), dtype=np.intp, count=len(tokens))
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        flat = np.empty(int(lengths.sum()), dtype=object)
+        flat[:] = [token for text_tokens in tokens for token in text_tokens]
+        codes, uniques = pd.factorize(flat)
+
+        # Single characters are dropped, punctuation is stripped per distinct token
+        keep = np.fromiter(map(len, uniques), dtype=np.intp, count=len(uniques))[codes] > 1
+        stripped = [self._strip_punctuation(token) for token in uniques]
+        mapped, vocabulary = pd.factorize(np.array(stripped, dtype=object))
+        return mapped[codes[keep]], rows[keep], np.asarray(vocabulary, dtype=object)
+
+    def polarity_scores(self, texts):
+        """Scores of every text as float64 arrays keyed like polarity_scores ('neg', 'neu', 'pos', 'compound')"""
+        c = self.constants
+        texts = [text if isinstance(text, str) else ("" if text is None or pd.isna(text) else str(text))
+                 for text in texts]
+        n_texts = len(texts)
+        ids, rows, vocabulary = self.tokenize(texts)
+        n_tokens = len(ids)
+
+        # Per distinct token, then gathered per token
+        lower = [token.lower() for token in vocabulary]
+        word = self.words.get_indexer(lower)
+        known = word >= 0
+        valence = np.where(known, self.valence[word], np.nan)[ids]
+        booster = np.where(known, self.booster[word], 0.0)[ids]
+        negated = (np.where(known, self.negation[word], False) | np.array(["n't" in w for w in lower], dtype=bool))[ids]
+        upper = np.array([token.isupper() for token in vocabulary], dtype=bool)[ids]
+        in_lexicon = ~np.isnan(valence)
+
+        def is_lower(target):
+            return np.array([w == target for w in lower], dtype=bool)[ids]
+
+        def is_exact(target):
+            return np.array([token == target for token in vocabulary], dtype=bool)[ids]
+
+        # Position of each token within its text, and its text's token count
+        counts = np.bincount(rows, minlength=n_texts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        position = np.arange(n_tokens) - starts[rows]
+        length = counts[rows]
+
+        # Positions of the neighbours offset places away that lie within the same text
+        neighbours = {}
+
+        def shifted(values, offset, fill):
+            """values of the token offset places away in the same text, fill beyond the text"""
+            if offset not in neighbours:
+                valid = (position + offset >= 0) & (position + offset < length)
+                neighbours[offset] = (valid, np.flatnonzero(valid) + offset)
+            valid, index = neighbours[offset]
+            out = np.full(n_tokens, fill, dtype=values.dtype)
+            out[valid] = values[index]
+            return out
+
+        # Some but not all tokens of the text in ALL CAPS
+        all_caps = np.bincount(rows, weights=upper, minlength=n_texts)
+        cap_differential = ((all_caps > 0) & (all_caps < counts))[rows]
+
+        # Valence of a lexicon word in its context
+        v = np.where(in_lexicon, valence, 0.0)
+        v = np.where(upper & cap_differential, np.where(v > 0, v + c.C_INCR, v - c.C_INCR), v)
+        never = is_exact("never")
+        so_this = is_exact("so") | is_exact("this")
+        for start_i in range(3):
+            offset = -(start_i + 1)
+            applies = in_lexicon & (position > start_i) & ~shifted(in_lexicon, offset, True)
+            scalar = shifted(booster, offset, 0.0)
+            scalar = np.where(v < 0, -scalar, scalar)
+            caps = (scalar != 0) & shifted(upper, offset, False) & cap_differential
+            scalar = scalar + np.where(caps, np.where(v > 0, c.C_INCR, -c.C_INCR), 0.0)
+            scalar = scalar * (1.0, 0.95, 0.9)[start_i]
+            v = np.where(applies, v + scalar, v)
+
+            # Negations and "never so/this" in front of the word
+            if start_i == 0:
+                factor = np.where(shifted(negated, -1, False), c.N_SCALAR, 1.0)
+            elif start_i == 1:
+                factor = np.where(shifted(never, -2, False) & shifted(so_this, -1, False), 1.5,
+                                  np.where(shifted(negated, -2, False), c.N_SCALAR, 1.0))
+            else:
+                factor = np.where((shifted(never, -3, False) & shifted(so_this, -2, False))
+                                  | shifted(so_this, -1, False), 1.25,
+                                  np.where(shifted(negated, -3, False), c.N_SCALAR, 1.0))
+            v = np.where(applies, v * factor, v)
+            if start_i == 2:
+                v = np.where(applies, self._idioms(v, ids, vocabulary, shifted), v)
+
+        # "least" in front of the word negates it, unless it is "at least"/"very least"
+        least = ~shifted(in_lexicon, -1, True) & shifted(is_lower("least"), -1, False)
+        excused = (position > 1) & (shifted(is_lower("at"), -2, False) | shifted(is_lower("very"), -2, False))
+        v = np.where(in_lexicon & least & ~excused, v * c.N_SCALAR, v)
+
+        # Boosters, and "kind" in "kind of", carry no sentiment themselves
+        skipped = (booster != 0) | (is_lower("kind") & shifted(is_lower("of"), 1, False))
+        v = np.where(in_lexicon & ~skipped, v, 0.0)
+
+        # polarity_scores evaluates a repeated token in the context of its first occurrence
+        _, first, inverse = np.unique(rows.astype(np.int64) * len(vocabulary) + ids,
+                                      return_index=True, return_inverse=True)
+        sentiments = v[first[inverse]]
+
+        # Sentiment before the first "but" is halved, after it is increased by half
+        but = is_lower("but")
+        first_but = np.full(n_texts, -1)
+        first_but[rows[but][::-1]] = position[but][::-1]
+        first_but = first_but[rows]
+        sentiments = np.where((first_but >= 0) & (position < first_but), sentiments * 0.5,
+                              np.where((first_but >= 0) & (position > first_but), sentiments * 1.5, sentiments))
+
+        return self._score_valence(texts, rows, sentiments, counts)
+
+    def _idioms(self, v, ids, vocabulary, shifted):
+        """Valence after the idiom check of the token at each position"""
+        token_id = {token: i for i, token in enumerate(vocabulary)}
+
+        def matches(phrase, offsets):
+            match = np.ones(len(ids), dtype=bool)
+            for word, offset in zip(phrase, offsets):
+                if word not in token_id:
+                    return np.zeros(len(ids), dtype=bool)
+                match &= shifted(ids, offset, -1) == token_id[word]
+            return match
+
+        # The first of these word windows that is an idiom sets the valence
+        windows = [(-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2)]
+        unset = np.ones(len(ids), dtype=bool)
+        for offsets in windows:
+            for phrase, value in self.idioms:
+                if len(phrase) == len(offsets):
+                    match = unset & matches(phrase, offsets)
+                    v = np.where(match, value, v)
+                    unset &= ~match
+        # Idioms starting at the word override that
+        for offsets in [(0, 1), (0, 1, 2)]:
+            for phrase, value in self.idioms:
+                if len(phrase) == len(offsets):
+                    v = np.where(matches(phrase, offsets), value, v)
+        # "kind of", "sort of" etc. right before the word dampen it
+        dampened = np.zeros(len(ids), dtype=bool)
+        for phrase in self.multiword_boosters:
+            dampened |= matches(phrase, (-3, -2)) | matches(phrase, (-2, -1))
+        return np.where(dampened, v + self.constants.B_DECR, v)
+
+    def _score_valence(self, texts, rows, sentiments, counts):
+        """Combine token sentiments into polarity_scores' normalized scores, per text"""
+        n_texts = len(texts)
+        total = np.bincount(rows, weights=sentiments, minlength=n_texts)
+
+        # Emphasis from exclamation points (up to 4) and question marks (2 or more)
+        exclamations = np.minimum(np.fromiter((text.count('!') for text in texts), dtype=np.int64, count=n_texts), 4)
+        questions = np.fromiter((text.count('?') for text in texts), dtype=np.int64, count=n_texts)
+        emphasis = exclamations * 0.292 + np.where(questions > 1, np.where(questions <= 3, questions * 0.18, 0.96), 0.0)
+
+        emphasized = np.where(total > 0, total + emphasis, np.where(total < 0, total - emphasis, total))
+        compound = emphasized / np.sqrt(emphasized * emphasized + 15)
+
+        positive = np.bincount(rows, weights=np.where(sentiments > 0, sentiments + 1, 0.0), minlength=n_texts)
+        negative = np.bincount(rows, weights=np.where(sentiments < 0, sentiments - 1, 0.0), minlength=n_texts)
+        neutral = np.bincount(rows, weights=sentiments == 0, minlength=n_texts)
+        more_positive, more_negative = positive > -negative, positive < -negative
+        positive = np.where(more_positive, positive + emphasis, positive)
+        negative = np.where(more_negative, negative - emphasis, negative)
+        denominator = positive - negative + neutral
+
+        has_tokens = counts > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = {
+                'neg': np.abs(negative / denominator),
+                'neu': np.abs(neutral / denominator),
+                'pos': np.abs(positive / denominator),
+            }
+        scores = {key: np.where(has_tokens, _round(values, 3), 0.0) for key, values in scores.items()}
+        scores['compound'] = np.where(has_tokens, _round(compound, 4), 0.0)
+        return scores
+
+def _round(values, digits):
+    """Python's round() per value: ndarray.round scales by 10**digits first, which
+    can tip a value sitting right at a rounding boundary the other way"""
+    return np.fromiter((round(value, digits) for value in values.tolist()), dtype=np.float64, count=len(values))